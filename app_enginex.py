@@ -10,6 +10,7 @@ import PyPDF2
 import io
 import docx
 import zipfile
+import xlsxwriter
 from pptx import Presentation
 import re
 
@@ -114,14 +115,19 @@ def extract_table_to_excel(text_content):
             
         headers = table_data[0]
         data_rows = table_data[1:]
-        df = pd.DataFrame(data_rows, columns=headers)
+        n_kolom = len(headers)
         
+        # Tulis langsung baris demi baris (constant_memory), tanpa DataFrame perantara
         output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, index=False, sheet_name='Data_ENGINEX')
-            worksheet = writer.sheets['Data_ENGINEX']
-            for i, col in enumerate(df.columns):
-                worksheet.set_column(i, i, 20)
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        worksheet = workbook.add_worksheet('Data_ENGINEX')
+        worksheet.set_column(0, n_kolom - 1, 20)
+        fmt_header = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        worksheet.write_row(0, 0, headers, fmt_header)
+        # Baris pendek: sel sisa dibiarkan kosong; baris panjang: dipotong sesuai jumlah header
+        for r, row in enumerate(data_rows, start=1):
+            worksheet.write_row(r, 0, row[:n_kolom])
+        workbook.close()
         output.seek(0)
         return output
     except Exception as e:
@@ -2,16 +2,28 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
 from anastruct.fem.system import SystemElements
 from io import BytesIO
+import os
+import tempfile
+import libs_cache as cache
+import libs_grid as grid
+import libs_frame3d as f3d
+import libs_sni as sni
+import libs_optimizer as opt
+import libs_export as exp
+import libs_pdf as pdf_rep
 
 # --- 1. CONFIG ---
 st.set_page_config(page_title="IndoBIM SAP Ultimate", layout="wide", page_icon="🏗️")
 
 # --- 2. CLASS & ENGINE ---
 class StructuralEngine:
-    def __init__(self, materials):
+    def __init__(self, materials, cache=None):
         self.materials = materials # fc, fy, E
+        self.cache = cache # libs_cache.ResultCache (opsional)
         
     def analyze_frame(self, nodes, elements, loads):
         """
@@ -24,29 +36,28 @@ class StructuralEngine:
         # Kita perlu mapping ID user ke ID AnaStruct
         
         # Build System
-        element_map = []
-        for el in elements:
-            # Cari koordinat node
-            n1 = nodes[nodes['ID'] == el['Start']].iloc[0]
-            n2 = nodes[nodes['ID'] == el['End']].iloc[0]
-            
-            # Define Section Properties (EI)
-            # E beton = 4700 * sqrt(fc)
-            E = 4700 * np.sqrt(self.materials['fc']) * 1000 # MPa -> kPa (kN/m2)
-            b, h = el['b'], el['h']
-            I = (b * h**3) / 12
-            A = b * h
-            
-            ss.add_element(location=[[n1['X'], n1['Z']], [n2['X'], n2['Z']]], 
-                           EA=E*A, EI=E*I)
-            element_map.append(el['ID'])
+        # Koordinat ujung semua elemen diambil sekaligus dari NodeStore (hash index)
+        store = nodes if isinstance(nodes, grid.NodeStore) else grid.NodeStore(nodes)
+        p1, p2 = store.resolve_endpoints(elements)
+        
+        # Define Section Properties (EI)
+        # E beton = 4700 * sqrt(fc)
+        E = 4700 * np.sqrt(self.materials['fc']) * 1000 # MPa -> kPa (kN/m2)
+        b = elements['b'].to_numpy(); h = elements['h'].to_numpy()
+        I = (b * h**3) / 12
+        A = b * h
+        
+        element_map = elements['ID'].tolist()
+        for i in range(len(element_map)):
+            ss.add_element(location=[[p1[i, 0], p1[i, 2]], [p2[i, 0], p2[i, 2]]], 
+                           EA=E*A[i], EI=E*I[i])
 
         # Add Supports (Tumpuan)
         # Asumsi Node dengan Z=0 adalah Jepit (Fixed)
-        for _, n in nodes.iterrows():
-            if n['Z'] == 0:
-                node_id = ss.find_node_id(location=[n['X'], n['Z']])
-                ss.add_support_fixed(node_id=node_id)
+        base = store.Z == 0
+        for x, z in zip(store.X[base], store.Z[base]):
+            node_id = ss.find_node_id(location=[x, z])
+            ss.add_support_fixed(node_id=node_id)
         
         # Add Loads (Beban)
         for load in loads:
@@ -60,6 +71,54 @@ class StructuralEngine:
         ss.solve()
         return ss
 
+    def analyze_space_frame(self, nodes, elements, q_load):
+        """
+        Menganalisa seluruh model 3D sekaligus (Sparse Space Frame, libs_frame3d)
+        Output: (engine, result) -> engine menyimpan geometri untuk plot portal
+        """
+        engine = f3d.Frame3D_Engine(self.materials).build(nodes, elements)
+        return engine, engine.solve(q_load)
+
+    def analyze_load_combinations(self, nodes, elements, load_cases, tabel_kombinasi, engine=None):
+        """
+        Analisa 3D untuk banyak kasus beban sekaligus (1x faktorisasi, multi-RHS),
+        lalu kombinasi & envelope dengan superposisi linear.
+        engine: hasil run sebelumnya (opsional). Jika geometri & material sama, hanya
+        penampang yang berubah diperbarui (re-analisa inkremental, tanpa build ulang).
+        Jika self.cache ada, hasil untuk model + beban yang sama diambil tanpa solve.
+        """
+        pakai_lama = (engine is not None and engine.materials['fc'] == self.materials['fc']
+                      and np.array_equal(engine.store.xyz, nodes.xyz))
+        key = None
+        if self.cache is not None:
+            key = cache.hash_stabil("kombinasi", f3d.VERSI_HASIL, nodes.ids, nodes.xyz,
+                                    elements[['Type', 'Start', 'End', 'b', 'h']],
+                                    self.materials, load_cases, tabel_kombinasi)
+            res = self.cache.get(key)
+            if res is not None:
+                # Hasil dari cache: engine cukup untuk geometri plot, penampang disamakan dengan model
+                if pakai_lama:
+                    engine.update_sections(elements)
+                else:
+                    engine = f3d.Frame3D_Engine(self.materials).build(nodes, elements)
+                return engine, res
+
+        if pakai_lama:
+            engine.update_sections(elements)
+        else:
+            engine = f3d.Frame3D_Engine(self.materials).build(nodes, elements)
+        res = engine.kombinasi(engine.solve_cases(load_cases), tabel_kombinasi)
+        if key is not None:
+            self.cache.put(key, res)
+        return engine, res
+
+@st.cache_resource
+def get_result_cache():
+    """Cache hasil analisa lintas rerun (LRU memori + folder temp di disk)"""
+    return cache.ResultCache(maks_bytes=256 * 2**20,
+                             folder_disk=os.path.join(tempfile.gettempdir(), "smartbim_cache", "analisa"),
+                             versi=f3d.VERSI_HASIL)
+
 # --- 3. SESSION STATE INIT ---
 if 'grid_x' not in st.session_state: st.session_state.grid_x = [0.0, 4.0, 8.0]
 if 'grid_y' not in st.session_state: st.session_state.grid_y = [0.0, 3.0, 6.0]
@@ -84,6 +143,17 @@ with st.sidebar:
     q_ll = st.number_input("Beban Hidup (kN/m)", 8.0)
     comb_1 = 1.2*q_dl + 1.6*q_ll
     st.info(f"Kombinasi 1.2D + 1.6L = {comb_1:.2f} kN/m")
+    f_gempa = st.number_input("Gaya Gempa Ex/Ey (kN/joint)", 0.0)
+    f_angin = st.number_input("Gaya Angin Wx/Wy (kN/joint)", 0.0)
+    
+    # Kasus Beban (D, L, E, W) -> dikombinasikan sesuai SNI 1727 tanpa solve ulang
+    load_cases = {'D': {'q': q_dl}, 'L': {'q': q_ll}}
+    if f_gempa > 0:
+        load_cases.update({'Ex': {'Fx': f_gempa}, 'Ey': {'Fy': f_gempa}})
+    if f_angin > 0:
+        load_cases.update({'Wx': {'Fx': f_angin}, 'Wy': {'Fy': f_angin}})
+    tabel_komb = sni.SNI_Load_1727.tabel_kombinasi(tuple(load_cases))
+    st.caption(f"{len(load_cases)} kasus beban, {len(tabel_komb)} kombinasi SNI 1727")
 
 # --- 5. TABS INTERFACE ---
 tab_geo, tab_model, tab_run, tab_design = st.tabs([
@@ -105,6 +175,7 @@ with tab_geo:
             st.session_state.grid_x = sorted([float(x) for x in gx_in.split(',')])
             st.session_state.grid_y = sorted([float(x) for x in gy_in.split(',')])
             st.session_state.levels = sorted([float(x) for x in gz_in.split(',')])
+            st.session_state.pop('frame3d', None)
             st.success("Grid Updated!")
             
     with c2:
@@ -118,82 +189,9 @@ with tab_model:
     st.subheader("🏗️ Generate Structure")
     st.caption("Aplikasi otomatis menghubungkan Grid menjadi Kerangka Struktur (Default).")
     
-    # Logic to Generate Nodes & Elements based on Grids
-    nodes = []
-    elements = []
-    
-    nid = 1
-    # Create Nodes
-    for z in st.session_state.levels:
-        for y in st.session_state.grid_y:
-            for x in st.session_state.grid_x:
-                nodes.append({"ID": nid, "X": x, "Y": y, "Z": z})
-                nid += 1
-    df_nodes = pd.DataFrame(nodes)
-    
-    # Create Elements (Logika Sederhana: Connect Grid neighbors)
-    # Kolom (Vertical)
-    eid = 1
-    for i, node in df_nodes.iterrows():
-        # Cari node di atasnya (Z+1) dengan X,Y sama
-        upper_node = df_nodes[
-            (df_nodes['X'] == node['X']) & 
-            (df_nodes['Y'] == node['Y']) & 
-            (df_nodes['Z'] > node['Z'])
-        ].sort_values('Z')
-        
-        if not upper_node.empty:
-            target = upper_node.iloc[0]
-            # Assign Section default
-            sec = st.session_state.sections[st.session_state.sections['Type']=='Kolom'].iloc[0]
-            elements.append({
-                "ID": f"C{eid}", "Type": "Column", 
-                "Start": node['ID'], "End": target['ID'], 
-                "b": sec['b (m)'], "h": sec['h (m)'], "Sec": sec['Label']
-            })
-            eid += 1
-            
-    # Balok Arah X
-    for i, node in df_nodes.iterrows():
-        if node['Z'] == 0: continue # Skip pondasi
-        right_node = df_nodes[
-            (df_nodes['Y'] == node['Y']) & 
-            (df_nodes['Z'] == node['Z']) & 
-            (df_nodes['X'] > node['X'])
-        ].sort_values('X')
-        
-        if not right_node.empty:
-            # Cek apakah tetangga grid terdekat
-            target = right_node.iloc[0]
-            # Asumsi hanya connect tetangga dekat (simplified logic)
-            sec = st.session_state.sections[st.session_state.sections['Type']=='Balok'].iloc[0]
-            elements.append({
-                "ID": f"Bx{eid}", "Type": "Beam", 
-                "Start": node['ID'], "End": target['ID'],
-                "b": sec['b (m)'], "h": sec['h (m)'], "Sec": sec['Label']
-            })
-            eid += 1
-
-    # Balok Arah Y
-    for i, node in df_nodes.iterrows():
-        if node['Z'] == 0: continue
-        back_node = df_nodes[
-            (df_nodes['X'] == node['X']) & 
-            (df_nodes['Z'] == node['Z']) & 
-            (df_nodes['Y'] > node['Y'])
-        ].sort_values('Y')
-        
-        if not back_node.empty:
-            target = back_node.iloc[0]
-            sec = st.session_state.sections[st.session_state.sections['Type']=='Balok'].iloc[0]
-            elements.append({
-                "ID": f"By{eid}", "Type": "Beam", 
-                "Start": node['ID'], "End": target['ID'],
-                "b": sec['b (m)'], "h": sec['h (m)'], "Sec": sec['Label']
-            })
-            eid += 1
-            
-    df_elements = pd.DataFrame(elements)
+    # Logic to Generate Nodes & Elements based on Grids (index arithmetic, O(n))
+    df_nodes, df_elements = grid.generate_grid_frame(
+        st.session_state.grid_x, st.session_state.grid_y, st.session_state.levels, st.session_state.sections)
     
     st.write(f"Model Generated: {len(df_nodes)} Joints, {len(df_elements)} Frames")
     with st.expander("Lihat Data Tabel Elemen"):
@@ -203,11 +201,15 @@ with tab_model:
     fig = plt.figure(figsize=(10, 6))
     ax = fig.add_subplot(111, projection='3d')
     
-    for _, el in df_elements.iterrows():
-        n1 = df_nodes[df_nodes['ID'] == el['Start']].iloc[0]
-        n2 = df_nodes[df_nodes['ID'] == el['End']].iloc[0]
-        col = 'blue' if el['Type'] == 'Column' else 'red'
-        ax.plot([n1['X'], n2['X']], [n1['Y'], n2['Y']], [n1['Z'], n2['Z']], c=col)
+    node_store = grid.NodeStore(df_nodes)
+    # Sidik model (geometri, penampang, material, beban) untuk mendeteksi hasil analisa basi
+    kunci_model = cache.hash_stabil(node_store.ids, node_store.xyz, df_elements[['Type', 'Start', 'End', 'b', 'h']],
+                                    {'fc': fc, 'fy': fy}, load_cases, tabel_komb)
+    if not df_elements.empty:
+        segs = node_store.segments(df_elements)
+        warna = np.where(df_elements['Type'] == 'Column', 'blue', 'red')
+        ax.add_collection3d(Line3DCollection(segs, colors=warna))
+        ax.auto_scale_xyz(node_store.X, node_store.Y, node_store.Z)
         
     ax.set_xlabel('X'); ax.set_ylabel('Y'); ax.set_zlabel('Z')
     st.pyplot(fig)
@@ -223,93 +225,75 @@ with tab_run:
                          ["Tampak Depan (Portal X-Z)", "Tampak Samping (Portal Y-Z)", "Tampak Atas (Denah)"], 
                          horizontal=True)
     
-    selected_frame_nodes = []
-    selected_frame_els = []
+    # RUN sekali untuk seluruh model 3D, semua view portal membaca hasil yang sama
+    if st.button("▶️ RUN ANALYSIS 3D (Momen & Gaya Dalam)"):
+        with st.spinner("Menyusun & Menyelesaikan Matriks Kekakuan 3D..."):
+            engine = StructuralEngine({'fc': fc, 'fy': fy}, cache=get_result_cache())
+            eng_lama = st.session_state.get('frame3d', (None,))[0]
+            eng3d, res3d = engine.analyze_load_combinations(node_store, df_elements, load_cases, tabel_komb,
+                                                            engine=eng_lama)
+            st.session_state.frame3d = (eng3d, res3d)
+            st.session_state.frame3d_kunci = kunci_model
+            
+            # Extract Results for Design (Envelope seluruh kombinasi)
+            st.session_state.last_result = {"Mu_max": float(res3d['Mu_env'].max()),
+                                            "My_max": float(res3d['My_env'].max())}
+        st.success(f"Analisa 3D Selesai: {len(df_elements)} elemen, {eng3d.n_dof} DOF, {len(res3d['Kombinasi'])} kombinasi")
     
-    if "Depan" in view_mode:
-        # User select Grid Y
-        grid_sel = st.selectbox("Pilih Grid Y (As Melintang):", st.session_state.grid_y)
-        st.caption(f"Menampilkan Portal 2D pada Grid Y = {grid_sel}")
-        
-        # Filter Nodes & Elements on this Plane
-        plane_nodes = df_nodes[df_nodes['Y'] == grid_sel]
+    frame3d = st.session_state.get('frame3d')
+    if frame3d is not None and st.session_state.get('frame3d_kunci') != kunci_model:
+        frame3d = None # Model / penampang / beban berubah, hasil lama tidak valid
+    
+    if "Depan" in view_mode or "Samping" in view_mode:
+        if "Depan" in view_mode:
+            # Portal X-Z pada Grid Y tertentu
+            grid_sel = st.selectbox("Pilih Grid Y (As Melintang):", st.session_state.grid_y)
+            st.caption(f"Menampilkan Portal 2D pada Grid Y = {grid_sel}")
+            sumbu = 1
+        else:
+            # Portal Y-Z pada Grid X tertentu
+            grid_sel = st.selectbox("Pilih Grid X (As Memanjang):", st.session_state.grid_x)
+            st.caption(f"Menampilkan Portal 2D pada Grid X = {grid_sel}")
+            sumbu = 0
         
         # Filter Elements that are completely within this plane
-        # (Both Start and End nodes must be on Y = grid_sel)
-        plane_ids = plane_nodes['ID'].tolist()
-        plane_els = df_elements[
-            (df_elements['Start'].isin(plane_ids)) & 
-            (df_elements['End'].isin(plane_ids))
-        ]
+        p1, p2 = node_store.resolve_endpoints(df_elements)
+        mask_plane = (p1[:, sumbu] == grid_sel) & (p2[:, sumbu] == grid_sel)
         
-        # PREPARE FOR SOLVER
-        # Run 2D Analysis using AnaStruct for this Frame
-        if st.button("▶️ RUN ANALYSIS (Momen & Gaya Dalam)"):
-            with st.spinner("Menghitung Matriks Kekakuan..."):
-                engine = StructuralEngine({'fc': fc, 'fy': fy})
-                # Define Load: Uniform load on Beams
-                loads = [{'Type': 'Distributed', 'Value': comb_1}] 
-                
-                # Running AnaStruct
-                # Note: AnaStruct works on X-Y, so we map Z to Y for visualization
-                # Mapping: Real X -> AnaStruct x, Real Z -> AnaStruct y
-                
-                # We need to reconstruct the system for AnaStruct
-                ss = SystemElements()
-                
-                # Add Beam/Col
-                for _, el in plane_els.iterrows():
-                    n1 = plane_nodes[plane_nodes['ID'] == el['Start']].iloc[0]
-                    n2 = plane_nodes[plane_nodes['ID'] == el['End']].iloc[0]
-                    
-                    # Convert to Local 2D (X, Z)
-                    ss.add_element(location=[[n1['X'], n1['Z']], [n2['X'], n2['Z']]], 
-                                   EI=5000) # Simplified EI
-                    
-                # Add Supports (Z=0)
-                for _, n in plane_nodes.iterrows():
-                    if n['Z'] == 0:
-                        nid = ss.find_node_id(location=[n['X'], n['Z']])
-                        ss.add_support_fixed(node_id=nid)
-                        
-                # Add Load
-                ss.q_load(q=-comb_1, element_id='all', direction='y')
-                ss.solve()
-                
-                c1, c2 = st.columns(2)
-                with c1:
-                    st.write("**Diagram Momen (M3)**")
-                    fig_m = ss.show_bending_moment(show=False)
-                    st.pyplot(fig_m)
-                with c2:
-                    st.write("**Displacement / Deformasi**")
-                    fig_d = ss.show_displacement(show=False)
-                    st.pyplot(fig_d)
-                    
-                # Extract Results for Design
-                st.session_state.last_result = {
-                    "Mu_max": max([abs(val) for sublist in ss.get_node_results_system(node_id=0)['moment'] for val in sublist]) if ss.get_node_results_system(node_id=0) else 15.0 # Dummy fallback if parsing complex
-                }
+        if frame3d is None:
+            st.info("Klik RUN ANALYSIS 3D untuk menghitung seluruh model.")
+        else:
+            eng3d, res3d = frame3d
+            komb_sel = st.selectbox("Kombinasi Beban:", res3d['Kombinasi'])
+            res_komb = f3d.ambil_kasus(res3d, komb_sel)
+            c1, c2 = st.columns(2)
+            with c1:
+                st.write("**Diagram Momen (M3)**")
+                st.pyplot(f3d.plot_portal(eng3d, res_komb, mask_plane, sumbu, mode="Momen"))
+            with c2:
+                st.write("**Displacement / Deformasi**")
+                st.pyplot(f3d.plot_portal(eng3d, res_komb, mask_plane, sumbu, mode="Deformasi"))
+            
+            with st.expander("Envelope Gaya Dalam per Elemen"):
+                st.dataframe(pd.DataFrame({
+                    "ID": eng3d.elements['ID'], "Type": eng3d.elements['Type'],
+                    "Mu Envelope M3 (kNm)": res3d['Mu_env'], "Kombinasi Kritis M3": res3d['Kombinasi_Kritis'],
+                    "Mu Envelope M2 (kNm)": res3d['My_env'], "Kombinasi Kritis M2": res3d['Kombinasi_Kritis_My'],
+                    "N Maks (kN)": res3d['N_env_max'], "N Min (kN)": res3d['N_env_min'],
+                })[mask_plane])
                 
-    elif "Samping" in view_mode:
-        st.info("Pilih Grid X untuk melihat Portal Arah Y (Belum diaktifkan di demo ini)")
-        
     elif "Atas" in view_mode:
         lvl_sel = st.selectbox("Pilih Lantai (Elevasi Z):", st.session_state.levels)
         # Plot Denah
         fig, ax = plt.subplots()
         # Filter elements on this level
-        plan_nodes = df_nodes[df_nodes['Z'] == lvl_sel]
-        plan_ids = plan_nodes['ID'].tolist()
-        plan_els = df_elements[(df_elements['Start'].isin(plan_ids)) & (df_elements['End'].isin(plan_ids))]
+        p1, p2 = node_store.resolve_endpoints(df_elements)
+        plan_els = df_elements[(p1[:, 2] == lvl_sel) & (p2[:, 2] == lvl_sel)]
         
-        for _, el in plan_els.iterrows():
-            n1 = df_nodes[df_nodes['ID'] == el['Start']].iloc[0]
-            n2 = df_nodes[df_nodes['ID'] == el['End']].iloc[0]
-            ax.plot([n1['X'], n2['X']], [n1['Y'], n2['Y']], 'k-', lw=2)
+        ax.add_collection(LineCollection(node_store.segments(plan_els, axes=(0, 1)), colors='k', lw=2))
             
         # Draw Columns as squares
-        col_nodes = df_nodes[(df_nodes['Z'] == lvl_sel)]
+        col_nodes = df_nodes[node_store.Z == lvl_sel]
         ax.scatter(col_nodes['X'], col_nodes['Y'], marker='s', s=100, c='red')
         
         ax.set_aspect('equal')
@@ -334,7 +318,7 @@ with tab_design:
         # Input Section to Check
         b_des = st.number_input("Lebar Balok (mm)", 250)
         h_des = st.number_input("Tinggi Balok (mm)", 400)
-        ds = 40 # selimut
+        ds = sni.SNI_Concrete_2847.DS # ke titik berat tulangan (sama dengan optimizer)
         d = h_des - ds
         
         # Hitung Luas Tulangan Perlu
@@ -366,3 +350,83 @@ with tab_design:
         st.metric("Estimasi Biaya Struktur", f"Rp {total_biaya:,.0f}")
         
         st.caption("*Volume dihitung otomatis dari geometri model 3D di Tab 2")
+
+    # Jadwal penulangan seluruh elemen dari hasil analisa 3D (vectorized, tanpa loop)
+    st.markdown("#### 3. Jadwal Penulangan Seluruh Elemen (Envelope Kombinasi)")
+    frame3d = st.session_state.get('frame3d')
+    if frame3d is None or st.session_state.get('frame3d_kunci') != kunci_model:
+        st.info("Jalankan RUN ANALYSIS 3D di Tab 3 untuk desain seluruh elemen.")
+    else:
+        eng3d, res3d = frame3d
+        dia_batch = st.selectbox("Diameter Tulangan Utama", [13, 16, 19, 22, 25], index=1)
+        el = eng3d.elements
+        b_el, h_el = el['b'].to_numpy() * 1000, el['h'].to_numpy() * 1000
+        beton = sni.SNI_Concrete_2847(fc, fy)
+        # Sumbu kuat (M3): lebar b, tinggi h. Sumbu lemah (M2): lebar h, tinggi b
+        des = beton.desain_tulangan_batch(res3d['Mu_env'], b_el, h_el, ds, dia=dia_batch)
+        des_y = beton.desain_tulangan_batch(res3d['My_env'], h_el, b_el, ds, dia=dia_batch)
+        ok = des['OK'] & des_y['OK']
+        # Kolom hanya dicek lentur per sumbu, interaksi aksial-lentur belum -> ditandai
+        kolom = el['Type'].to_numpy() == 'Column'
+        
+        df_des = pd.DataFrame({
+            "ID": el['ID'], "Type": el['Type'], "b (mm)": b_el, "h (mm)": h_el,
+            "Mu3 (kNm)": res3d['Mu_env'], "Kombinasi M3": res3d['Kombinasi_Kritis'],
+            "As_req M3 (mm2)": des['As_req'], "As_min M3 (mm2)": des['As_min'],
+            "Tulangan M3": np.char.add(des['n_bar'].astype(str), f" D{dia_batch}"),
+            "phi.Mn3 (kNm)": des['phi_Mn'],
+            "Mu2 (kNm)": res3d['My_env'], "Kombinasi M2": res3d['Kombinasi_Kritis_My'],
+            "As_req M2 (mm2)": des_y['As_req'],
+            "Tulangan M2": np.char.add(des_y['n_bar'].astype(str), f" D{dia_batch}"),
+            "phi.Mn2 (kNm)": des_y['phi_Mn'],
+            "Status": np.where(ok, np.where(kolom, "OK*", "OK"), "GAGAL"),
+        })
+        n_gagal = int((~ok).sum())
+        c_a, c_b = st.columns(2)
+        c_a.metric("Elemen Didesain", f"{len(df_des)}")
+        c_b.metric("Elemen Gagal", f"{n_gagal}", delta=None if n_gagal == 0 else "Perbesar Penampang",
+                   delta_color="inverse")
+        st.dataframe(df_des.round(1), use_container_width=True)
+        if kolom.any():
+            st.caption("OK* = kolom hanya dicek lentur per sumbu; interaksi aksial-lentur (P-M) belum dicek.")
+        # Excel disusun hanya saat diminta (bukan tiap rerun), bytes disimpan per model + diameter
+        kunci_des = cache.hash_stabil(kunci_model, dia_batch)
+        if st.button("📊 Buat Jadwal Penulangan Excel"):
+            with st.spinner("Menyusun Excel..."):
+                xlsx_des = BytesIO()
+                exp.Export_Engine().write_excel_stream(xlsx_des, [
+                    ("Jadwal Penulangan", list(df_des.columns), exp.Export_Engine.baris_kolom(df_des))])
+                st.session_state['xlsx_desain'] = (kunci_des, xlsx_des.getvalue())
+        if st.session_state.get('xlsx_desain', (None,))[0] == kunci_des:
+            st.download_button("📥 Download Jadwal Penulangan (.xlsx)", st.session_state['xlsx_desain'][1],
+                               "Jadwal_Penulangan.xlsx")
+        
+        # Laporan perhitungan seluruh elemen (render paralel per potongan halaman)
+        mode_lap = st.radio("Format Laporan PDF", ["Ringkas (Tabel)", "Lengkap (Per Elemen)"], horizontal=True)
+        if st.button("📄 Buat Laporan Perhitungan PDF"):
+            with st.spinner("Menyusun laporan..."):
+                st.session_state['pdf_desain'] = pdf_rep.create_batch_report(
+                    el, res3d['Mu_env'], des, dia=dia_batch, kombinasi=res3d['Kombinasi_Kritis'],
+                    mode="lengkap" if mode_lap.startswith("Lengkap") else "ringkas",
+                    My=res3d['My_env'], desain_y=des_y, kombinasi_y=res3d['Kombinasi_Kritis_My'])
+        if st.session_state.get('pdf_desain'):
+            st.download_button("📥 Download Laporan (.pdf)", st.session_state['pdf_desain'],
+                               "Laporan_Desain_Elemen.pdf", "application/pdf")
+        
+        # Optimasi grup penampang balok seluruh gedung (analisa ulang bila kekakuan berubah)
+        st.markdown("#### 4. Optimasi Grup Penampang Balok")
+        c_g1, c_g2 = st.columns(2)
+        n_grup = c_g1.slider("Jumlah Kelas Momen per Bentang", 2, 20, 6)
+        tol_k = c_g2.number_input("Toleransi Perubahan Kekakuan", 0.01, 1.0, 0.05)
+        if st.button("⚙️ OPTIMASI GRUP PENAMPANG"):
+            with st.spinner("Mengoptimasi grup & menganalisa ulang..."):
+                harga_opt = {'beton': hsp_beton, 'baja': hsp_besi, 'bekisting': 150000}
+                eng_opt = f3d.Frame3D_Engine({'fc': fc, 'fy': fy}).build(node_store, df_elements)
+                hasil_opt = opt.ProjectOptimizer(fc, fy, harga_opt).optimasi(
+                    eng_opt, load_cases, tabel_komb, n_grup=n_grup, toleransi=tol_k)
+            if hasil_opt['konvergen']:
+                st.success(f"Konvergen dalam {len(hasil_opt['riwayat'])} iterasi")
+            else:
+                st.warning("Belum konvergen - perubahan kekakuan masih di atas toleransi")
+            st.write("Statistik per Iterasi"); st.dataframe(hasil_opt['riwayat'], use_container_width=True)
+            st.write("Penampang per Grup"); st.dataframe(hasil_opt['grup'].round(1), use_container_width=True)
@@ -1,4 +1,20 @@
 import pandas as pd
+import numpy as np
+
+# Aturan pencocokan nama bahan -> kunci daftar harga (urutan = prioritas, substring pertama menang)
+ATURAN_HARGA_BAHAN = [
+    ("semen", "semen"), ("pasir", "pasir"), ("split", "split"), ("kayu", "kayu"),
+    ("besi", "besi"), ("batu kali", "batu kali"), ("beton", "beton k300"),
+    ("bata", "bata merah"), ("cat", "cat tembok"), ("pipa", "pipa pvc"),
+]
+
+def kunci_harga_bahan(item):
+    """Nama bahan AHSP (misal 'Semen (kg)') -> kunci harga ('semen'), None jika tidak dikenal"""
+    key_clean = item.split(" (")[0].lower()
+    for pola, kunci in ATURAN_HARGA_BAHAN:
+        if pola in key_clean:
+            return kunci
+    return None
 
 class AHSP_Engine:
     def __init__(self):
@@ -61,32 +77,57 @@ class AHSP_Engine:
             }
         }
 
+        self.kompilasi()
+
+    # ==========================================
+    # KOMPILASI: MATRIKS KOEFISIEN (ANALISA x SUMBER DAYA)
+    # ==========================================
+    def kompilasi(self):
+        """
+        Susun ulang tabel koefisien menjadi matriks (analisa x sumber daya) dengan kunci harga
+        yang sudah di-resolve. Panggil lagi jika self.koefisien diubah.
+        Kolom sumber daya: ('bahan', kunci harga) / ('upah', nama upah lowercase).
+        """
+        self.kode = list(self.koefisien.keys())
+        self.indeks = {k: i for i, k in enumerate(self.kode)}
+        self.sumber = []
+        kolom = {}
+        baris, kol, nilai = [], [], []
+        for i, k in enumerate(self.kode):
+            data = self.koefisien[k]
+            item_sumber = [(("bahan", kunci_harga_bahan(item)), koef) for item, koef in data['bahan'].items()]
+            item_sumber += [(("upah", item.lower()), koef) for item, koef in data['upah'].items()]
+            for sumber, koef in item_sumber:
+                if sumber[1] is None:
+                    continue # Bahan tanpa harga (kontribusi 0)
+                if sumber not in kolom:
+                    kolom[sumber] = len(self.sumber)
+                    self.sumber.append(sumber)
+                baris.append(i); kol.append(kolom[sumber]); nilai.append(koef)
+        self.matriks = np.zeros((len(self.kode), len(self.sumber)))
+        np.add.at(self.matriks, (baris, kol), nilai) # Sumber sama dalam 1 analisa dijumlah
+
+    def vektor_harga(self, harga_bahan_dasar, harga_upah_dasar):
+        """Daftar harga (dict) -> vektor harga sesuai urutan kolom matriks"""
+        return np.array([(harga_bahan_dasar if jenis == "bahan" else harga_upah_dasar).get(kunci, 0)
+                         for jenis, kunci in self.sumber], dtype=float)
+
+    def hitung_semua(self, harga_bahan_dasar, harga_upah_dasar):
+        """HSP seluruh analisa sekaligus (satu perkalian matriks-vektor). Output: Series per kode."""
+        hsp = self.matriks @ self.vektor_harga(harga_bahan_dasar, harga_upah_dasar)
+        return pd.Series(hsp, index=self.kode, name="HSP")
+
+    def hitung_wilayah(self, daftar_harga):
+        """
+        HSP seluruh analisa untuk banyak daftar harga regional sekaligus.
+        daftar_harga: dict {wilayah: (harga_bahan_dasar, harga_upah_dasar)}
+        Output: DataFrame (analisa x wilayah)
+        """
+        P = np.column_stack([self.vektor_harga(hb, hu) for hb, hu in daftar_harga.values()]) \
+            if daftar_harga else np.zeros((len(self.sumber), 0))
+        return pd.DataFrame(self.matriks @ P, index=self.kode, columns=list(daftar_harga.keys()))
+
     def hitung_hsp(self, kode_analisa, harga_bahan_dasar, harga_upah_dasar):
-        if kode_analisa not in self.koefisien: return 0
-        data = self.koefisien[kode_analisa]
-        total_bahan = 0
-        total_upah = 0
-        
-        for item, koef in data['bahan'].items():
-            key_clean = item.split(" (")[0].lower()
-            h_satuan = 0
-            # Logic pencocokan harga
-            if "semen" in key_clean: h_satuan = harga_bahan_dasar.get('semen', 0)
-            elif "pasir" in key_clean: h_satuan = harga_bahan_dasar.get('pasir', 0)
-            elif "split" in key_clean: h_satuan = harga_bahan_dasar.get('split', 0)
-            elif "kayu" in key_clean: h_satuan = harga_bahan_dasar.get('kayu', 0)
-            elif "besi" in key_clean: h_satuan = harga_bahan_dasar.get('besi', 0)
-            elif "batu kali" in key_clean: h_satuan = harga_bahan_dasar.get('batu kali', 0)
-            elif "beton" in key_clean: h_satuan = harga_bahan_dasar.get('beton k300', 0)
-            elif "bata" in key_clean: h_satuan = harga_bahan_dasar.get('bata merah', 0)
-            elif "cat" in key_clean: h_satuan = harga_bahan_dasar.get('cat tembok', 0)
-            elif "pipa" in key_clean: h_satuan = harga_bahan_dasar.get('pipa pvc', 0)
-            
-            total_bahan += koef * h_satuan
-            
-        for item, koef in data['upah'].items():
-            item_lower = item.lower()
-            h_upah = harga_upah_dasar.get(item_lower, 0)
-            total_upah += koef * h_upah
-            
-        return total_bahan + total_upah
+        if kode_analisa not in self.indeks: return 0
+        p = self.vektor_harga(harga_bahan_dasar, harga_upah_dasar)
+        return float(self.matriks[self.indeks[kode_analisa]] @ p)
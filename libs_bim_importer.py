@@ -1,29 +1,184 @@
 import ifcopenshell
 import ifcopenshell.util.placement # Wajib ada untuk Matrix
+import ifcopenshell.util.unit
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
 import tempfile
+import shutil
 import os
 import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import libs_cache as cache
+
+# Stempel versi output parser. Naikkan jika logika parse berubah -> cache IFC lama basi.
+VERSI_PARSER = "ifc-parser-2"
+
+# Engine per proses worker (dibuka sekali per path, dipakai ulang antar shard)
+_ENGINE_WORKER = {}
+
+# Perkiraan RAM satu model ifcopenshell terbuka relatif ukuran file (konservatif).
+# Tiap worker paralel memegang satu model utuh -> jumlah worker dibatasi memori bebas.
+FAKTOR_MEMORI_MODEL = 10
+
+def _engine_worker(path):
+    engine = _ENGINE_WORKER.get(path)
+    if engine is None:
+        engine = IFC_Parser_Engine.dari_path(path)
+        _ENGINE_WORKER.clear()
+        _ENGINE_WORKER[path] = engine
+    return engine
+
+def _rencana_worker(args):
+    """Worker process pool: buka file IFC lalu susun rencana shard (model tetap di-cache worker)"""
+    path, stages, n_proses = args
+    engine = _engine_worker(path)
+    target, tipe_mep = engine._rencana(stages)
+    return target, tipe_mep, engine._rencana_shard(target, n_proses)
+
+def _parse_shard(args):
+    """Worker process pool: buka file IFC sendiri lalu parse satu shard (daftar id entitas)"""
+    path, stages, target, tipe_mep, e_type, id_entitas = args
+    engine = _engine_worker(path)
+    records = engine.iter_records(stages, target=target, tipe_mep=tipe_mep, hanya_tipe=e_type, id_entitas=id_entitas)
+    return engine._agregasi(records)
+
+def batas_proses_memori(path, n_proses):
+    """
+    Batasi jumlah proses paralel ke memori bebas: tiap worker membuka model utuh
+    (~FAKTOR_MEMORI_MODEL x ukuran file). Memori bebas tidak terbaca (mis. Windows) -> 1 (serial).
+    """
+    try:
+        bebas = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return 1
+    per_model = max(os.path.getsize(path) * FAKTOR_MEMORI_MODEL, 1)
+    return max(1, min(n_proses, os.cpu_count() or 1, int(bebas // per_model)))
 
 class IFC_Parser_Engine:
-    def __init__(self, file_bytes):
-        # 1. Simpan file sementara agar bisa dibaca ifcopenshell
-        self.temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".ifc")
-        self.temp_file.write(file_bytes.read())
-        self.temp_file.close()
+    # Daftar Tipe Elemen Struktur
+    TIPE_STRUKTUR = [
+        "IfcColumn",          # Kolom
+        "IfcBeam",            # Balok
+        "IfcMember",          # Rangka Baja / Facade
+        "IfcPlate",           # Pelat Lantai
+        "IfcFooting",         # Pondasi
+        "IfcPile",            # Tiang Pancang
+        "IfcWall",            # Dinding
+        "IfcWallStandardCase",
+        "IfcSlab"             # Tambahan untuk lantai
+    ]
+    TIPE_ARSITEK = ["IfcWall", "IfcWallStandardCase", "IfcDoor", "IfcWindow"]
+    NAMA_LUAS_DINDING = ["NetSideArea", "GrossSideArea", "Area", "NetArea"]
+    NAMA_PANJANG_MEP = ["Length", "NominalLength", "GrossLength"]
+    PROGRESS_SETIAP = 1000 # Panggil callback progress setiap n entitas
+    KOLOM_GEOMETRI = ["X1", "Y1", "Z1", "X2", "Y2", "Z2", "b", "h", "Panjang", "Volume"]
+    # Tipe IfcPhysicalQuantity -> (Jenis, atribut nilai). Tambah baris untuk jenis kuantitas baru.
+    JENIS_KUANTITAS = {
+        "IfcQuantityLength": ("Length", "LengthValue"),
+        "IfcQuantityArea": ("Area", "AreaValue"),
+        "IfcQuantityVolume": ("Volume", "VolumeValue"),
+        "IfcQuantityCount": ("Count", "CountValue"),
+        "IfcQuantityWeight": ("Weight", "WeightValue"),
+        "IfcQuantityTime": ("Time", "TimeValue"),
+    }
+
+    def __init__(self, file_bytes, path=None, buka=True):
+        """
+        file_bytes: upload (file-like / bytes). path: buka langsung dari file di disk (mode worker).
+        File temp dipertahankan sampai close() agar worker paralel bisa membukanya sendiri.
+        buka=False: hanya simpan file temp, model baru dibuka saat dibutuhkan (_buka).
+        Dipakai parse paralel agar proses induk tidak ikut memegang model utuh.
+        """
+        self.path = path
+        self._path_temp = None
+        if path is None:
+            # 1. Simpan file sementara agar bisa dibaca ifcopenshell
+            # Disalin per potongan (copyfileobj) -> upload ratusan MB tidak dibaca utuh ke RAM
+            self.temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".ifc")
+            if isinstance(file_bytes, (bytes, bytearray)):
+                self.temp_file.write(file_bytes)
+            else:
+                if hasattr(file_bytes, "seek"): file_bytes.seek(0)
+                shutil.copyfileobj(file_bytes, self.temp_file, 16 * 2**20)
+            self.temp_file.close()
+            self.path = self._path_temp = self.temp_file.name
         
+        self.ifc_file = None
+        self.skala = 1.0
+        # Cache matrix global placement: entity id -> 4x4
+        self._cache_placement = {}
+        # Cache geometri per IfcShapeRepresentation id (geometri tipe dipetakan berkali-kali)
+        self._cache_geom = {}
+        # Index kuantitas (dibangun sekali saat pertama dibutuhkan)
+        self._indeks_q = None
+        self._tabel_q = None
+        if buka:
+            self._buka()
+
+    def _buka(self):
+        """Buka model IFC dari self.path (sekali) + skala satuan panjang"""
+        if self.ifc_file is not None:
+            return
         try:
             # Load file IFC
-            self.ifc_file = ifcopenshell.open(self.temp_file.name)
+            self.ifc_file = ifcopenshell.open(self.path)
         except Exception as e:
-            if os.path.exists(self.temp_file.name):
-                os.unlink(self.temp_file.name)
+            self.close()
             raise ValueError(f"File IFC rusak atau tidak valid: {e}")
         
-        # Hapus file temp setelah load ke memori
-        if os.path.exists(self.temp_file.name):
-            os.unlink(self.temp_file.name)
+        # Skala satuan panjang file -> meter (file mm: 0.001)
+        try:
+            self.skala = float(ifcopenshell.util.unit.calculate_unit_scale(self.ifc_file))
+        except Exception:
+            self.skala = 1.0
+
+    @classmethod
+    def dari_path(cls, path):
+        """Buka IFC langsung dari path (tanpa salin temp) - dipakai worker paralel"""
+        return cls(None, path=path)
+
+    def close(self):
+        """Hapus file temp hasil upload"""
+        if self._path_temp and os.path.exists(self._path_temp):
+            os.unlink(self._path_temp)
+        self._path_temp = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def _matriks_relatif(self, placement):
+        """Matrix 4x4 placement TERHADAP induknya saja (tanpa rantai PlacementRelTo)"""
+        if placement.is_a("IfcLocalPlacement"):
+            return ifcopenshell.util.placement.get_axis2placement(placement.RelativePlacement)
+        # IfcGridPlacement dll: sudah absolut
+        return ifcopenshell.util.placement.get_local_placement(placement)
+
+    def get_global_matrix(self, placement):
+        """
+        Matrix Global 4x4 sebuah placement, di-memo per entity id.
+        Global = Global(Induk) * Relatif. Setiap placement (Site/Building/Storey) dihitung
+        sekali saja, elemen yang berbagi induk cukup 1 perkalian lokal.
+        """
+        cache = self._cache_placement
+        # 1. Naik ke atas sampai ketemu placement yang sudah di-cache (atau akar)
+        rantai = []
+        current = placement
+        while current is not None and current.id() not in cache:
+            rantai.append(current)
+            current = getattr(current, "PlacementRelTo", None) if current.is_a("IfcLocalPlacement") else None
+        induk = cache[current.id()] if current is not None else np.eye(4)
+        
+        # 2. Turun dari ATAS (Site) ke BAWAH (Element), simpan tiap level
+        for p in reversed(rantai):
+            induk = induk @ self._matriks_relatif(p)
+            cache[p.id()] = induk
+        return induk
 
     def get_global_coordinates(self, element):
         """
@@ -35,189 +190,432 @@ class IFC_Parser_Engine:
             if not placement:
                 return 0.0, 0.0, 0.0
             
-            # 1. Kumpulkan semua hierarki placement (Anak -> Bapak -> Kakek -> Buyut)
-            placements = []
-            current = placement
-            while current:
-                placements.append(current)
-                if hasattr(current, "PlacementRelTo"):
-                    current = current.PlacementRelTo
-                else:
-                    current = None
-            
-            # 2. Mulai dengan Matrix Identitas (0,0,0)
-            global_matrix = np.eye(4)
-            
-            # 3. Kalikan Matrix dari ATAS (Site) ke BAWAH (Element)
-            # Urutan Matematika: Global = Parent * Child
-            for p in reversed(placements):
-                # Ubah placement object menjadi Matrix 4x4
-                local_matrix = ifcopenshell.util.placement.get_local_placement(p)
-                
-                # Kalikan Akumulasi
-                global_matrix = np.matmul(global_matrix, local_matrix)
-            
-            # 4. Ambil Kolom Terakhir (Translasi X, Y, Z)
-            x_final = float(global_matrix[0][3])
-            y_final = float(global_matrix[1][3])
-            z_final = float(global_matrix[2][3])
-            
-            return x_final, y_final, z_final
+            # Ambil Kolom Terakhir (Translasi X, Y, Z) dalam meter
+            x_final, y_final, z_final = self.get_global_matrix(placement)[:3, 3] * self.skala
+            return float(x_final), float(y_final), float(z_final)
             
         except Exception as e:
             # Fallback jika terjadi error matematika (Sangat jarang)
             return 0.0, 0.0, 0.0
 
-    def parse_structure(self):
+    def get_global_coordinates_batch(self, items):
         """
-        Mengambil Elemen Struktur Utama dengan Koordinat Global.
+        Koordinat global untuk banyak elemen sekaligus. Output: array (N, 3).
+        Matrix induk diambil dari cache lalu translasi relatif ditransformasi dalam
+        satu operasi einsum (N x 3 x 3).
         """
-        elements = []
-        
-        # Daftar Tipe Elemen Struktur
-        target_types = [
-            "IfcColumn",          # Kolom
-            "IfcBeam",            # Balok
-            "IfcMember",          # Rangka Baja / Facade
-            "IfcPlate",           # Pelat Lantai
-            "IfcFooting",         # Pondasi
-            "IfcPile",            # Tiang Pancang
-            "IfcWall",            # Dinding
-            "IfcWallStandardCase",
-            "IfcSlab"             # Tambahan untuk lantai
-        ]
-        
-        for e_type in target_types:
+        n = len(items)
+        R_induk = np.tile(np.eye(3), (n, 1, 1))
+        t_induk = np.zeros((n, 3))
+        t_lokal = np.zeros((n, 3))
+        for i, item in enumerate(items):
             try:
-                # Ambil semua elemen berdasarkan tipe
-                items = self.ifc_file.by_type(e_type)
-                
-                for item in items:
-                    # Lewati elemen tanpa geometri placement
-                    if not hasattr(item, "ObjectPlacement"):
-                        continue
-                        
-                    # HITUNG KOORDINAT GLOBAL (Logic Baru)
-                    x, y, z = self.get_global_coordinates(item)
-                    
-                    # Ambil Nama yang bersih
-                    name = item.Name if item.Name else f"Unnamed {e_type.replace('Ifc', '')}"
-                    
-                    # Simpan data ke list
-                    elements.append({
-                        "Type": e_type.replace("Ifc", ""), 
-                        "Name": name, 
-                        "X": round(x, 2), 
-                        "Y": round(y, 2), 
-                        "Z": round(z, 2),
-                        "GUID": item.GlobalId
-                    })
+                placement = getattr(item, "ObjectPlacement", None)
+                if not placement: continue
+                rel = getattr(placement, "PlacementRelTo", None) if placement.is_a("IfcLocalPlacement") else None
+                M_induk = self.get_global_matrix(rel) if rel is not None else np.eye(4)
+                R_induk[i], t_induk[i] = M_induk[:3, :3], M_induk[:3, 3]
+                t_lokal[i] = self._matriks_relatif(placement)[:3, 3]
             except Exception:
-                continue # Skip jika tipe tersebut tidak ada di file
-            
-        return pd.DataFrame(elements)
+                R_induk[i] = np.eye(3); t_induk[i] = 0.0; t_lokal[i] = 0.0
+        return (np.einsum('nij,nj->ni', R_induk, t_lokal) + t_induk) * self.skala
+
+    def get_coordinates_by_type(self, e_type):
+        """Batch per tipe IFC -> (list GUID, array (N, 3))"""
+        items = self._by_type(e_type)
+        return [it.GlobalId for it in items], self.get_global_coordinates_batch(items)
+
+    # ------------------------------------------
+    # STREAMING SATU LINTASAN (GENERATOR)
+    # ------------------------------------------
+    def _by_type(self, e_type):
+        try:
+            return self.ifc_file.by_type(e_type)
+        except Exception:
+            return [] # Tipe tidak ada di schema file ini
 
-    def parse_architectural_quantities(self):
+    def _tipe_mep(self):
+        """Tipe MEP sesuai versi schema (IFC4: Pipe/Duct Segment, fallback IfcFlowSegment)"""
+        if self.ifc_file.schema == "IFC4":
+            if self._by_type("IfcPipeSegment") or self._by_type("IfcDuctSegment"):
+                return ["IfcPipeSegment", "IfcDuctSegment"]
+        return ["IfcFlowSegment"]
+
+    def iter_entitas(self, target_types, progress=None, hanya_tipe=None, id_entitas=None):
         """
-        Mengambil Volume Dinding, Jumlah Pintu, dan Jendela.
+        Generator (e_type, entity) untuk gabungan tipe, setiap entitas dikunjungi SEKALI:
+        entitas diproses di tipe PERTAMA dalam target_types yang mencakupnya (subtipe yang juga
+        tercakup tipe induk sebelumnya dilewati). Aturan ini tidak butuh state, sehingga hasil
+        shard paralel identik dengan lintasan serial.
+        hanya_tipe: proses satu tipe saja dari target_types (shard per tipe).
+        id_entitas: daftar id entitas shard (dari _rencana_shard, sudah bebas duplikat subtipe)
+            -> diambil langsung by_id tanpa menelusuri semua entitas tipe tsb.
+        progress: callable(fraksi 0..1, pesan) - dipanggil per tipe & tiap PROGRESS_SETIAP entitas
         """
-        total_wall_area = 0.0
-        
-        # --- 1. HITUNG DINDING ---
-        walls = []
-        try: walls.extend(self.ifc_file.by_type("IfcWall"))
-        except: pass
-        try: walls.extend(self.ifc_file.by_type("IfcWallStandardCase"))
-        except: pass
-        
-        # Hapus duplikat
-        walls = list(set(walls))
-        
-        for wall in walls:
-            area_found = False
-            # Strategi 1: Cek Property Sets (BaseQuantities)
-            if hasattr(wall, "IsDefinedBy"):
-                for rel in wall.IsDefinedBy:
-                    if rel.is_a("IfcRelDefinesByProperties"):
-                        if hasattr(rel, "RelatingPropertyDefinition"):
-                            props = rel.RelatingPropertyDefinition
-                            if props.is_a("IfcElementQuantity"):
-                                for q in props.Quantities:
-                                    # Cari parameter Area yang valid
-                                    if q.Name in ["NetSideArea", "GrossSideArea", "Area", "NetArea"]:
-                                        val = 0.0
-                                        if hasattr(q, "AreaValue"): val = q.AreaValue
-                                        # Kadang Revit salah taruh di VolumeValue
-                                        elif hasattr(q, "VolumeValue") and q.VolumeValue < 200: 
-                                            val = q.VolumeValue 
-                                        
-                                        if val > 0:
-                                            total_wall_area += val
-                                            area_found = True
-                                            break
-                    if area_found: break
-            
-            # Strategi 2: Jika Property kosong, estimasi kasar
-            if not area_found:
-                # Asumsi default kecil agar tidak 0
-                total_wall_area += 10.0
-
-        # --- 2. HITUNG PINTU & JENDELA ---
-        try: doors = len(self.ifc_file.by_type("IfcDoor"))
-        except: doors = 0
-        
-        try: windows = len(self.ifc_file.by_type("IfcWindow"))
-        except: windows = 0
-        
+        n_tipe = len(target_types)
+        for i, e_type in enumerate(target_types):
+            if hanya_tipe is not None and e_type != hanya_tipe: continue
+            sebelumnya = target_types[:i] if id_entitas is None else []
+            items = self._by_type(e_type) if id_entitas is None else [self.ifc_file.by_id(k) for k in id_entitas]
+            n = len(items)
+            for j, item in enumerate(items):
+                if progress is not None and j % self.PROGRESS_SETIAP == 0:
+                    progress((i + j / max(n, 1)) / n_tipe, f"{e_type}: {j}/{n}")
+                if any(item.is_a(t) for t in sebelumnya): continue
+                yield e_type, item
+            del items # Lepas wrapper tipe ini sebelum tipe berikutnya
+        if progress is not None:
+            progress(1.0, "Selesai")
+
+    def _record_struktur(self, e_type, item):
+        # HITUNG KOORDINAT GLOBAL (Logic Baru)
+        x, y, z = self.get_global_coordinates(item)
+        # Ambil Nama yang bersih
+        name = item.Name if item.Name else f"Unnamed {e_type.replace('Ifc', '')}"
+        rec = {"Type": e_type.replace("Ifc", ""), "Name": name,
+               "X": round(x, 2), "Y": round(y, 2), "Z": round(z, 2), "GUID": item.GlobalId}
+        try:
+            geo = self.geometri_elemen(item)
+        except Exception:
+            geo = None
+        rec.update(geo if geo is not None else dict.fromkeys(self.KOLOM_GEOMETRI, np.nan))
+        return rec
+
+    # ------------------------------------------
+    # GEOMETRI ELEMEN (AXIS, PROFIL, EKSTRUSI)
+    # ------------------------------------------
+    @staticmethod
+    def _titik(p):
+        """IfcCartesianPoint -> array 3D (titik 2D diberi z=0)"""
+        c = list(p.Coordinates) + [0.0] * (3 - len(p.Coordinates))
+        return np.array(c[:3], dtype=float)
+
+    @staticmethod
+    def _dimensi_profil(profil):
+        """Profil -> (b, h, luas) dalam satuan file. None jika tipe profil tidak dikenal."""
+        if profil.is_a("IfcRectangleProfileDef"):
+            return profil.XDim, profil.YDim, profil.XDim * profil.YDim
+        if profil.is_a("IfcCircleProfileDef"):
+            return 2 * profil.Radius, 2 * profil.Radius, math.pi * profil.Radius**2
+        if hasattr(profil, "OverallWidth") and hasattr(profil, "OverallDepth"):
+            b, h = profil.OverallWidth, profil.OverallDepth
+            tw, tf = getattr(profil, "WebThickness", None), getattr(profil, "FlangeThickness", None)
+            luas = 2 * b * tf + (h - 2 * tf) * tw if tw and tf else None # Profil I
+            return b, h, luas
+        if profil.is_a("IfcArbitraryClosedProfileDef") and profil.OuterCurve.is_a("IfcPolyline"):
+            xy = np.array([list(p.Coordinates)[:2] for p in profil.OuterCurve.Points], dtype=float)
+            luas = 0.5 * abs(np.dot(xy[:, 0], np.roll(xy[:, 1], 1)) - np.dot(xy[:, 1], np.roll(xy[:, 0], 1)))
+            b, h = xy.max(axis=0) - xy.min(axis=0)
+            return b, h, luas
+        return None
+
+    def _geometri_representasi(self, rep):
+        """
+        Baca satu IfcShapeRepresentation (koordinat lokal objek), di-cache per id representasi.
+        Output dict: axis (2 titik) | origin, arah, panjang (ekstrusi) | b, h, luas (profil)
+        """
+        key = rep.id()
+        if key in self._cache_geom:
+            return self._cache_geom[key]
+
+        g = {}
+        for item in rep.Items or []:
+            if item.is_a("IfcMappedItem"):
+                # Geometri tipe (dipakai banyak elemen): transformasi MappingOrigin
+                src = item.MappingSource
+                sub = self._geometri_representasi(src.MappedRepresentation)
+                M = ifcopenshell.util.placement.get_axis2placement(src.MappingOrigin) if src.MappingOrigin else np.eye(4)
+                for k, v in sub.items():
+                    if k == "axis": v = [M[:3, :3] @ p + M[:3, 3] for p in v]
+                    elif k == "origin": v = M[:3, :3] @ v + M[:3, 3]
+                    elif k == "arah": v = M[:3, :3] @ v
+                    g.setdefault(k, v)
+                continue
+            # Boolean / clipping (balok terpotong): ambil solid dasarnya
+            while item.is_a("IfcBooleanResult"):
+                item = item.FirstOperand
+            if item.is_a("IfcPolyline") and "axis" not in g:
+                g["axis"] = [self._titik(item.Points[0]), self._titik(item.Points[-1])]
+            elif item.is_a("IfcExtrudedAreaSolid") and "panjang" not in g:
+                M = ifcopenshell.util.placement.get_axis2placement(item.Position) if item.Position else np.eye(4)
+                arah = M[:3, :3] @ np.array(item.ExtrudedDirection.DirectionRatios, dtype=float)
+                g["origin"] = M[:3, 3]
+                g["arah"] = arah / np.linalg.norm(arah)
+                g["panjang"] = float(item.Depth)
+                dim = self._dimensi_profil(item.SweptArea)
+                if dim is not None:
+                    g["b"], g["h"], g["luas"] = dim
+        self._cache_geom[key] = g
+        return g
+
+    def geometri_elemen(self, element):
+        """
+        Geometri nyata satu elemen (meter): titik ujung global (X1..Z2) dari representasi Axis,
+        atau dari ekstrusi Body; dimensi profil b x h; panjang & volume ekstrusi.
+        Return None jika elemen tidak punya representasi yang bisa dibaca.
+        """
+        shape = getattr(element, "Representation", None)
+        if shape is None or not getattr(element, "ObjectPlacement", None):
+            return None
+        g = {}
+        for rep in shape.Representations or []:
+            for k, v in self._geometri_representasi(rep).items():
+                g.setdefault(k, v)
+        if not g:
+            return None
+
+        M = self.get_global_matrix(element.ObjectPlacement)
+        if "axis" in g:
+            p1, p2 = g["axis"]
+        elif "panjang" in g:
+            p1 = g["origin"]
+            p2 = g["origin"] + g["arah"] * g["panjang"]
+        else:
+            return None
+        p1 = (M[:3, :3] @ p1 + M[:3, 3]) * self.skala
+        p2 = (M[:3, :3] @ p2 + M[:3, 3]) * self.skala
+        s = self.skala
+        panjang = g["panjang"] * s if "panjang" in g else float(np.linalg.norm(p2 - p1))
+        luas = g.get("luas")
         return {
-            "Luas Dinding (m2)": round(total_wall_area, 2),
-            "Jumlah Pintu (Unit)": doors,
-            "Jumlah Jendela (Unit)": windows
+            "X1": round(p1[0], 3), "Y1": round(p1[1], 3), "Z1": round(p1[2], 3),
+            "X2": round(p2[0], 3), "Y2": round(p2[1], 3), "Z2": round(p2[2], 3),
+            "b": g["b"] * s if "b" in g else np.nan, "h": g["h"] * s if "h" in g else np.nan,
+            "Panjang": round(panjang, 3),
+            "Volume": luas * s**2 * panjang if luas is not None else np.nan,
         }
 
-    def parse_mep_quantities(self):
+    # ------------------------------------------
+    # INDEX KUANTITAS (INVERSE RELATIONSHIP)
+    # ------------------------------------------
+    def bangun_indeks_kuantitas(self):
         """
-        Mengambil Panjang Pipa & Ducting.
+        Scan SEKALI semua IfcRelDefinesByProperties -> IfcElementQuantity, lalu bangun:
+          - self._indeks_q : element id -> {nama kuantitas: (nilai, jenis)}
+          - self._tabel_q  : DataFrame kolom bertipe (ElementID, Set, Name, Jenis, Nilai)
+        Menggantikan penelusuran IsDefinedBy per elemen (inverse lookup berulang).
         """
-        total_len = 0.0
-        mep_elements = []
-        
-        # Deteksi Versi Schema IFC
-        schema = self.ifc_file.schema
-        
-        # Ambil elemen berdasarkan versi
-        if schema == "IFC4":
-            try: mep_elements.extend(self.ifc_file.by_type("IfcPipeSegment"))
-            except: pass
-            try: mep_elements.extend(self.ifc_file.by_type("IfcDuctSegment"))
-            except: pass
-        
-        # Fallback untuk IFC2x3 atau jika kosong
-        if not mep_elements:
-            try: mep_elements.extend(self.ifc_file.by_type("IfcFlowSegment"))
-            except: pass
-
-        for item in mep_elements:
-            length = 0.0
-            # Cari property Length
-            if hasattr(item, "IsDefinedBy"):
-                for rel in item.IsDefinedBy:
-                    if rel.is_a("IfcRelDefinesByProperties"):
-                        if hasattr(rel, "RelatingPropertyDefinition"):
-                            props = rel.RelatingPropertyDefinition
-                            if props.is_a("IfcElementQuantity"):
-                                for q in props.Quantities:
-                                    if q.Name in ["Length", "NominalLength", "GrossLength"] and hasattr(q, "LengthValue"):
-                                        if q.LengthValue > 0:
-                                            length = q.LengthValue
-                                            break
-            # Fallback jika tidak ada data length
-            if length == 0: length = 1.0 
-            total_len += length
-            
-        return {
-            "Panjang Pipa/Duct (m')": round(total_len, 2)
+        indeks = {}
+        kolom = {"ElementID": [], "Set": [], "Name": [], "Jenis": [], "Nilai": []}
+        for rel in self._by_type("IfcRelDefinesByProperties"):
+            props = getattr(rel, "RelatingPropertyDefinition", None)
+            if props is None or not props.is_a("IfcElementQuantity"):
+                continue
+            # Baca kuantitas set ini sekali, lalu bagikan ke semua objek terkait
+            nilai_set = []
+            for q in props.Quantities or []:
+                jenis, attr = self.JENIS_KUANTITAS.get(q.is_a(), (None, None))
+                if jenis is None:
+                    continue
+                val = getattr(q, attr, None)
+                if val is not None:
+                    nilai_set.append((q.Name, float(val), jenis))
+            if not nilai_set:
+                continue
+            for obj in rel.RelatedObjects or []:
+                eid = obj.id()
+                entri = indeks.setdefault(eid, {})
+                for nama, val, jenis in nilai_set:
+                    entri.setdefault(nama, (val, jenis)) # Definisi pertama yang dipakai
+                    kolom["ElementID"].append(eid); kolom["Set"].append(props.Name)
+                    kolom["Name"].append(nama); kolom["Jenis"].append(jenis); kolom["Nilai"].append(val)
+
+        self._indeks_q = indeks
+        self._tabel_q = pd.DataFrame({
+            "ElementID": np.asarray(kolom["ElementID"], dtype=np.int64),
+            "Set": pd.Series(kolom["Set"], dtype="string"),
+            "Name": pd.Series(kolom["Name"], dtype="category"),
+            "Jenis": pd.Series(kolom["Jenis"], dtype="category"),
+            "Nilai": np.asarray(kolom["Nilai"], dtype=float),
+        })
+        return self._indeks_q
+
+    @property
+    def tabel_kuantitas(self):
+        """Semua kuantitas elemen dalam satu DataFrame bertipe (untuk takeoff / pivot)"""
+        if self._tabel_q is None:
+            self.bangun_indeks_kuantitas()
+        return self._tabel_q
+
+    def kuantitas(self, element, nama, jenis=None, batas=None):
+        """
+        Nilai kuantitas pertama (urut prioritas 'nama') yang > 0 untuk sebuah elemen.
+        jenis: filter jenis ("Area", "Length", ...). batas: nilai harus < batas.
+        Return None jika tidak ada.
+        """
+        if self._indeks_q is None:
+            self.bangun_indeks_kuantitas()
+        entri = self._indeks_q.get(element.id() if hasattr(element, "id") else element)
+        if not entri:
+            return None
+        for n in nama:
+            if n in entri:
+                val, j = entri[n]
+                if jenis is not None and j not in jenis: continue
+                if batas is not None and val >= batas: continue
+                if val > 0: return val
+        return None
+
+    def _luas_dinding(self, wall):
+        """Luas dinding dari BaseQuantities (Strategi 1). Return None jika tidak ada."""
+        val = self.kuantitas(wall, self.NAMA_LUAS_DINDING, jenis=("Area",))
+        if val is None:
+            # Kadang Revit salah taruh di VolumeValue
+            val = self.kuantitas(wall, self.NAMA_LUAS_DINDING, jenis=("Volume",), batas=200)
+        return val
+
+    def _panjang_mep(self, item):
+        """Panjang pipa/duct dari BaseQuantities. Return None jika tidak ada."""
+        return self.kuantitas(item, self.NAMA_PANJANG_MEP, jenis=("Length",))
+
+    def _rencana(self, stages):
+        """Daftar tipe target (urutan tetap) + tipe MEP untuk stage yang diminta"""
+        tipe_mep = self._tipe_mep() if "mep" in stages else []
+        target = []
+        if "struktur" in stages: target += self.TIPE_STRUKTUR
+        if "arsitektur" in stages: target += self.TIPE_ARSITEK
+        target += sorted(tipe_mep)
+        return list(dict.fromkeys(target)), tipe_mep # Unik, urutan dipertahankan
+
+    def iter_records(self, stages=("struktur", "arsitektur", "mep"), progress=None,
+                     target=None, tipe_mep=None, hanya_tipe=None, id_entitas=None):
+        """
+        Pipeline generator satu lintasan: tiap entitas dibaca sekali lalu diteruskan ke
+        stage yang membutuhkan. Yield tuple (stage, jenis, nilai):
+          ("struktur", "elemen", dict record)
+          ("arsitektur", "dinding" | "pintu" | "jendela", luas / 1)
+          ("mep", "segmen", panjang)
+        target / tipe_mep / hanya_tipe / id_entitas: diisi parse_paralel untuk satu shard.
+        """
+        if target is None:
+            target, tipe_mep = self._rencana(stages)
+        tipe_struktur = set(self.TIPE_STRUKTUR) if "struktur" in stages else set()
+        tipe_mep = set(tipe_mep or [])
+
+        for e_type, item in self.iter_entitas(target, progress, hanya_tipe, id_entitas):
+            if e_type in tipe_struktur and hasattr(item, "ObjectPlacement"):
+                try:
+                    yield "struktur", "elemen", self._record_struktur(e_type, item)
+                except Exception:
+                    pass
+            if "arsitektur" in stages:
+                if e_type in ("IfcWall", "IfcWallStandardCase"):
+                    val = self._luas_dinding(item)
+                    # Strategi 2: Jika Property kosong, estimasi kasar (asumsi default kecil agar tidak 0)
+                    yield "arsitektur", "dinding", val if val is not None else 10.0
+                elif e_type == "IfcDoor":
+                    yield "arsitektur", "pintu", 1
+                elif e_type == "IfcWindow":
+                    yield "arsitektur", "jendela", 1
+            if e_type in tipe_mep:
+                val = self._panjang_mep(item)
+                # Fallback jika tidak ada data length
+                yield "mep", "segmen", val if val is not None else 1.0
+
+    @staticmethod
+    def _agregasi(records):
+        """Kumpulkan record streaming -> (kolom struktur, total QTO). Hasil bisa di-pickle."""
+        kolom = {k: [] for k in ["Type", "Name", "X", "Y", "Z", "GUID"] + IFC_Parser_Engine.KOLOM_GEOMETRI}
+        total = {"dinding": 0.0, "pintu": 0, "jendela": 0, "segmen": 0.0}
+        for stage, jenis, nilai in records:
+            if stage == "struktur":
+                for k in kolom: kolom[k].append(nilai[k])
+            else:
+                total[jenis] += nilai
+        return kolom, total
+
+    @staticmethod
+    def _hasil(kolom, total):
+        df_s = pd.DataFrame(kolom) if kolom["Type"] else pd.DataFrame()
+        q_a = {
+            "Luas Dinding (m2)": round(total["dinding"], 2),
+            "Jumlah Pintu (Unit)": total["pintu"],
+            "Jumlah Jendela (Unit)": total["jendela"]
         }
+        q_m = {
+            "Panjang Pipa/Duct (m')": round(total["segmen"], 2)
+        }
+        return df_s, q_a, q_m
+
+    def parse_all(self, progress=None, stages=("struktur", "arsitektur", "mep"), n_proses=1):
+        """
+        Parse Struktur + QTO Arsitek + QTO MEP dalam SATU lintasan.
+        Agregasi dilakukan sambil streaming (kolom list untuk struktur, akumulator untuk QTO).
+        n_proses > 1: dibagi ke process pool (lihat parse_paralel).
+        Output: (df_struktur, qto_arsitek, qto_mep)
+        """
+        if n_proses and n_proses > 1:
+            return self.parse_paralel(n_proses, progress, stages)
+        self._buka()
+        return self._hasil(*self._agregasi(self.iter_records(stages, progress)))
+
+    def _rencana_shard(self, target, n_proses):
+        """
+        Bagi pekerjaan per tipe IFC. Tipe yang jauh lebih besar dari rata-rata beban per
+        proses dipecah ke beberapa potongan berurutan. Shard membawa daftar id entitas
+        (subtipe yang tercakup tipe sebelumnya sudah dibuang) -> worker cukup by_id.
+        Output: list (e_type, list id), urutan sama dengan lintasan serial.
+        """
+        ids = {t: [] for t in target}
+        for e_type, item in self.iter_entitas(target):
+            ids[e_type].append(item.id())
+        beban = max(sum(map(len, ids.values())) / n_proses, 1)
+        shard = []
+        for t in target:
+            n = len(ids[t])
+            if n == 0: continue
+            k = min(n_proses, int(math.ceil(n / beban)))
+            shard += [(t, ids[t][(i * n) // k:((i + 1) * n) // k]) for i in range(k)]
+        return shard
+
+    def parse_paralel(self, n_proses=None, progress=None, stages=("struktur", "arsitektur", "mep")):
+        """
+        Parse paralel di process pool. Proses induk tidak membuka model: rencana shard
+        disusun oleh worker pertama (modelnya di-cache & dipakai ulang untuk shard), lalu
+        tiap worker membuka file sendiri dan mengerjakan daftar id entitasnya.
+        Puncak memori ~ n_proses model -> n_proses dibatasi batas_proses_memori; jika
+        hanya 1 yang muat, jatuh ke parse serial. Hasil identik dengan parse_all serial.
+        """
+        n_proses = batas_proses_memori(self.path, n_proses or os.cpu_count() or 1)
+        if n_proses <= 1:
+            return self.parse_all(progress, stages)
+
+        with ProcessPoolExecutor(max_workers=n_proses) as pool:
+            target, tipe_mep, shard = pool.submit(_rencana_worker, (self.path, stages, n_proses)).result()
+            if not shard:
+                return self._hasil(*self._agregasi([]))
+            hasil = [None] * len(shard)
+            # Shard besar dikirim lebih dulu, hasil tetap digabung menurut urutan rencana
+            urutan = sorted(range(len(shard)), key=lambda i: -len(shard[i][1]))
+            futures = {pool.submit(_parse_shard, (self.path, stages, target, tipe_mep, *shard[i])): i
+                       for i in urutan}
+            for selesai, fut in enumerate(as_completed(futures), 1):
+                hasil[futures[fut]] = fut.result()
+                if progress is not None:
+                    progress(selesai / len(shard), f"{shard[futures[fut]][0]}: shard {selesai}/{len(shard)}")
+
+        # Gabung: kolom struktur disambung, total QTO dijumlah
+        kolom = {k: [v for kol, _ in hasil for v in kol[k]] for k in hasil[0][0]}
+        total = {k: sum(tot[k] for _, tot in hasil) for k in hasil[0][1]}
+        return self._hasil(kolom, total)
+
+    def parse_structure(self, progress=None):
+        """
+        Mengambil Elemen Struktur Utama dengan Koordinat Global.
+        """
+        return self.parse_all(progress, stages=("struktur",))[0]
+
+    def parse_architectural_quantities(self, progress=None):
+        """
+        Mengambil Volume Dinding, Jumlah Pintu, dan Jendela.
+        """
+        return self.parse_all(progress, stages=("arsitektur",))[1]
+
+    def parse_mep_quantities(self, progress=None):
+        """
+        Mengambil Panjang Pipa & Ducting.
+        """
+        return self.parse_all(progress, stages=("mep",))[2]
 
     def calculate_architectural_loads(self):
         """
@@ -226,3 +624,161 @@ class IFC_Parser_Engine:
         q = self.parse_architectural_quantities()
         beban_dinding = q["Luas Dinding (m2)"] * 2.0
         return {"Total Load Tambahan (kN)": round(beban_dinding, 2)}
+
+# ==========================================
+# CACHE HASIL PARSE (KEY = HASH KONTEN FILE IFC)
+# ==========================================
+def parse_dengan_cache(file_bytes, hasil_cache, progress=None, n_proses=1):
+    """
+    Parse IFC lewat cache persisten. File yang sama (hash konten) tidak dibuka ulang oleh
+    ifcopenshell: hasil diambil dari memori / file .npz kolumnar di disk.
+    hasil_cache: libs_cache.ResultCache (versi = VERSI_PARSER).
+    Output: (df_struktur, qto_arsitek, qto_mep, dari_cache)
+    """
+    key = cache.hash_stabil(VERSI_PARSER, cache.hash_file(file_bytes))
+    data = hasil_cache.get(key)
+    dari_cache = data is not None
+    if data is None:
+        # Paralel: induk hanya menyimpan file temp, model dibuka di worker
+        engine = IFC_Parser_Engine(file_bytes, buka=not (n_proses and n_proses > 1))
+        try:
+            df_s, q_a, q_m = engine.parse_all(progress, n_proses=n_proses)
+        finally:
+            engine.close()
+        # Disimpan datar (npz tidak mendukung dict bersarang)
+        data = hasil_cache.put(key, {
+            "struktur": df_s,
+            "qa_nama": list(q_a), "qa_nilai": [float(v) for v in q_a.values()],
+            "qm_nama": list(q_m), "qm_nilai": [float(v) for v in q_m.values()],
+        })
+    q_a = {k: (int(v) if k.startswith("Jumlah") else v) for k, v in zip(data["qa_nama"], data["qa_nilai"])}
+    q_m = dict(zip(data["qm_nama"], data["qm_nilai"]))
+    return data["struktur"], q_a, q_m, dari_cache
+
+# ==========================================
+# KONVERSI IFC -> MODEL ANALISA (NODE & ELEMEN)
+# ==========================================
+def _pecah_di_node_antara(n1, n2, xyz, toleransi):
+    """
+    Cari node yang berjarak <= toleransi dari sumbu member (bukan ujungnya) dengan KD-tree:
+    kandidat = node di dalam bola (titik tengah, L/2 + toleransi), lalu jarak titik-ke-segmen
+    dihitung eksak. Node di-snap ke proyeksinya pada member terdekat, member induk dipecah
+    berurutan sepanjang sumbu.
+    Output: (index member asal, node awal, node akhir, xyz) per potongan.
+    """
+    a, b = xyz[n1], xyz[n2]
+    arah = b - a
+    L = np.linalg.norm(arah, axis=1)
+    ok = L > toleransi
+    seg = np.flatnonzero(ok)
+    bola = cKDTree(xyz).query_ball_point((a[seg] + b[seg]) / 2, L[seg] / 2 + toleransi)
+    jumlah = np.fromiter(map(len, bola), dtype=np.int64, count=len(seg))
+    if jumlah.sum() == 0:
+        return np.arange(len(n1)), n1, n2, xyz
+    s = np.repeat(seg, jumlah)
+    node = np.concatenate([np.asarray(v, dtype=np.int64) for v in bola if len(v)])
+
+    # Proyeksi titik ke sumbu: t (0..1) & jarak tegak lurus
+    t = np.einsum('ij,ij->i', xyz[node] - a[s], arah[s]) / L[s]**2
+    proyeksi = a[s] + t[:, None] * arah[s]
+    jarak = np.linalg.norm(xyz[node] - proyeksi, axis=1)
+    antara = ((jarak <= toleransi) & (t * L[s] > toleransi) & ((1 - t) * L[s] > toleransi) &
+              (node != n1[s]) & (node != n2[s]))
+    s, node, t, proyeksi, jarak = s[antara], node[antara], t[antara], proyeksi[antara], jarak[antara]
+    if len(s) == 0:
+        return np.arange(len(n1)), n1, n2, xyz
+
+    # Snap: tiap node dipindah ke proyeksi pada member induk terdekat
+    xyz = xyz.copy()
+    dekat = np.lexsort((jarak, node))
+    pertama = dekat[np.r_[True, node[dekat][1:] != node[dekat][:-1]]]
+    xyz[node[pertama]] = np.round(proyeksi[pertama], 3)
+
+    # Pecah: rantai n1 -> node antara (urut t) -> n2 per member induk
+    urut = np.lexsort((t, s))
+    s, node = s[urut], node[urut]
+    induk, mulai, n_antara = np.unique(s, return_index=True, return_counts=True)
+    n_potong = np.ones(len(n1), dtype=np.int64)
+    n_potong[induk] += n_antara
+    asal = np.repeat(np.arange(len(n1)), n_potong)
+    # Urutan titik per member: [n1, antara..., n2] -> potongan (titik[k], titik[k+1])
+    titik = np.empty(len(asal) + len(n1), dtype=np.int64)
+    posisi = np.cumsum(n_potong + 1) - (n_potong + 1) # awal rantai tiap member
+    titik[posisi] = n1
+    titik[posisi + n_potong] = n2
+    lokal = np.arange(len(s)) - np.repeat(mulai, n_antara) # urutan node antara dalam induk
+    titik[np.repeat(posisi[induk], n_antara) + 1 + lokal] = node
+    akhir_rantai = np.zeros(len(titik), dtype=bool)
+    akhir_rantai[posisi + n_potong] = True
+    return asal, titik[~akhir_rantai], titik[np.r_[False, ~akhir_rantai[:-1]]], xyz
+
+def ifc_ke_model_analisa(df_struktur, toleransi=0.05, tipe=("Column", "Beam"),
+                         section_default={"Column": (0.4, 0.4), "Beam": (0.25, 0.5)}):
+    """
+    Ubah Kolom & Balok hasil parse IFC (dengan titik ujung X1..Z2) menjadi
+    (df_nodes, df_elements) berformat sama dengan libs_grid.generate_grid_frame.
+    Titik ujung yang berdekatan (<= toleransi meter) digabung menjadi satu node memakai
+    KD-tree (cKDTree.query_pairs + connected components) -> O(n log n), bukan pairwise.
+    Node yang jatuh di tengah bentang member lain (sambungan T, kolom di atas balok) di-snap
+    ke sumbu member tersebut dan member induknya dipecah di titik itu (potongan mewarisi
+    properti & GUID member asal).
+    Node diurutkan Z -> Y -> X (ID mulai 1). Elemen nol-panjang / duplikat dibuang.
+    """
+    kosong = (pd.DataFrame(columns=["ID", "X", "Y", "Z"]),
+              pd.DataFrame(columns=["ID", "Type", "Start", "End", "b", "h", "Sec", "GUID"]))
+    if df_struktur is None or df_struktur.empty or "X1" not in df_struktur:
+        return kosong
+    df = df_struktur[df_struktur['Type'].isin(tipe)].dropna(subset=["X1", "Y1", "Z1", "X2", "Y2", "Z2"])
+    if df.empty:
+        return kosong
+
+    p1 = df[["X1", "Y1", "Z1"]].to_numpy(dtype=float)
+    p2 = df[["X2", "Y2", "Z2"]].to_numpy(dtype=float)
+    m = len(df)
+    P = np.vstack([p1, p2])
+
+    # 1. Snap titik ujung: pasangan dalam radius toleransi -> komponen terhubung = 1 node
+    pasangan = cKDTree(P).query_pairs(toleransi, output_type='ndarray')
+    G = sp.coo_matrix((np.ones(len(pasangan)), (pasangan[:, 0], pasangan[:, 1])), shape=(2 * m, 2 * m))
+    n_node, label = connected_components(G, directed=False)
+
+    # Koordinat node = rata-rata titik anggota
+    jumlah = np.bincount(label, minlength=n_node)
+    xyz = np.stack([np.bincount(label, weights=P[:, k], minlength=n_node) for k in range(3)], axis=1)
+    xyz = np.round(xyz / jumlah[:, None], 3) # Bersihkan noise floating point (presisi 1 mm)
+
+    # 1b. Node di tengah bentang member lain -> snap ke sumbu & pecah member induk
+    asal, n1, n2, xyz = _pecah_di_node_antara(label[:m], label[m:], xyz, toleransi)
+
+    # 2. Penomoran node Z -> Y -> X seperti generator grid
+    # (dibandingkan per kelas toleransi agar noise kecil tidak mengacak urutan baris grid)
+    kunci = np.round(xyz / max(toleransi, 1e-9))
+    urut = np.lexsort((kunci[:, 0], kunci[:, 1], kunci[:, 2]))
+    rank = np.empty(n_node, dtype=np.int64)
+    rank[urut] = np.arange(n_node)
+    start = rank[n1] + 1
+    end = rank[n2] + 1
+
+    # 3. Buang elemen nol-panjang & duplikat (pasangan node sama)
+    a, b_ = np.minimum(start, end), np.maximum(start, end)
+    valid = start != end
+    _, unik = np.unique(np.stack([a, b_], axis=1)[valid], axis=0, return_index=True)
+    pilih = np.flatnonzero(valid)[np.sort(unik)]
+
+    el = df.iloc[asal[pilih]]
+    jenis = el['Type'].to_numpy()
+    b_def = np.array([section_default[t][0] for t in jenis])
+    h_def = np.array([section_default[t][1] for t in jenis])
+    prefix = np.where(jenis == "Column", "C", "B")
+
+    df_nodes = pd.DataFrame({"ID": np.arange(1, n_node + 1), "X": xyz[urut, 0], "Y": xyz[urut, 1], "Z": xyz[urut, 2]})
+    df_elements = pd.DataFrame({
+        "ID": np.char.add(prefix.astype(str), np.arange(1, len(el) + 1).astype(str)),
+        "Type": jenis,
+        "Start": start[pilih], "End": end[pilih],
+        "b": np.where(el['b'].notna(), el['b'], b_def).astype(float),
+        "h": np.where(el['h'].notna(), el['h'], h_def).astype(float),
+        "Sec": el['Name'].to_numpy(),
+        "GUID": el['GUID'].to_numpy(),
+    })
+    return df_nodes, df_elements
@@ -0,0 +1,261 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# HASH KONTEN STABIL (LINTAS RERUN & PROSES)
+# ==========================================
+def _update_hash(h, obj):
+    """Masukkan obj ke hasher secara rekursif & deterministik (tanpa pickle / id objek)"""
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        h.update(f"num:{float(obj)!r};".encode()) # 25 == 25.0 == np.float64(25)
+    elif obj is None or isinstance(obj, (bool, str)):
+        h.update(f"{type(obj).__name__}:{obj!r};".encode())
+    elif isinstance(obj, bytes):
+        h.update(b"bytes:" + obj)
+    elif isinstance(obj, pd.DataFrame):
+        h.update(f"df:{list(obj.columns)!r}:{len(obj)};".encode())
+        if len(obj):
+            h.update(pd.util.hash_pandas_object(obj, index=False).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        _update_hash(h, obj.to_frame())
+    elif isinstance(obj, np.ndarray):
+        arr = np.ascontiguousarray(obj)
+        h.update(f"nd:{arr.dtype.str}:{arr.shape};".encode())
+        if arr.dtype == object:
+            for v in arr.ravel():
+                _update_hash(h, v)
+        else:
+            h.update(arr.tobytes())
+    elif isinstance(obj, dict):
+        # Urutan insertion dipertahankan (urutan kasus/kombinasi menentukan urutan hasil)
+        h.update(f"dict:{len(obj)};".encode())
+        for k, v in obj.items():
+            _update_hash(h, k)
+            _update_hash(h, v)
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"seq:{len(obj)};".encode())
+        for v in obj:
+            _update_hash(h, v)
+    elif hasattr(obj, 'xyz'):
+        _update_hash(h, obj.xyz) # NodeStore: geometri node
+    else:
+        raise TypeError(f"Tipe tidak bisa di-hash stabil: {type(obj).__name__}")
+
+def hash_stabil(*parts):
+    """Hash konten (hex) dari kombinasi grid, section, material, beban, dst."""
+    h = hashlib.blake2b(digest_size=20)
+    for p in parts:
+        _update_hash(h, p)
+    return h.hexdigest()
+
+def hash_file(data, chunk=1 << 20):
+    """Hash konten file (bytes, file-like, atau path) - dibaca per potongan"""
+    h = hashlib.blake2b(digest_size=20)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        h.update(data)
+    elif hasattr(data, "read"):
+        if hasattr(data, "seek"): data.seek(0)
+        for blok in iter(lambda: data.read(chunk), b""):
+            h.update(blok)
+        if hasattr(data, "seek"): data.seek(0)
+    else:
+        with open(data, 'rb') as f:
+            for blok in iter(lambda: f.read(chunk), b""):
+                h.update(blok)
+    return h.hexdigest()
+
+def ukuran_bytes(obj):
+    """Estimasi memori (bytes) hasil analisa: array, DataFrame, dict/list bersarang"""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(np.sum(obj.memory_usage(index=True, deep=True)))
+    if isinstance(obj, dict):
+        return sum(ukuran_bytes(k) + ukuran_bytes(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sum(ukuran_bytes(v) for v in obj) + 8 * len(obj)
+    if isinstance(obj, str):
+        return len(obj) + 50
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj) + 33
+    return 64
+
+# ==========================================
+# SERIALISASI DICT HASIL -> NPZ (TANPA PICKLE)
+# ==========================================
+def simpan_npz(path, data, versi=""):
+    """
+    Simpan dict {nama: array | skalar | list | DataFrame} ke .npz.
+    DataFrame disimpan kolom per kolom (columnar). Tulis atomik (tmp -> rename).
+    """
+    arrays, tipe = {}, {}
+    for k, v in data.items():
+        if isinstance(v, pd.DataFrame):
+            tipe[k] = ["df", [str(c) for c in v.columns]]
+            for i, c in enumerate(v.columns):
+                kol = v[c].to_numpy()
+                if kol.dtype == object:
+                    kol = kol.astype(str)
+                arrays[f"{k}/{i}"] = kol
+        elif isinstance(v, (list, tuple)):
+            tipe[k] = ["list"]
+            arrays[k] = np.asarray(v)
+        elif isinstance(v, (np.ndarray, np.generic, int, float, bool, str)):
+            tipe[k] = ["arr"]
+            arrays[k] = np.asarray(v)
+        else:
+            raise TypeError(f"'{k}': tipe {type(v).__name__} tidak bisa disimpan ke npz")
+        if k in arrays and arrays[k].dtype == object:
+            raise TypeError(f"'{k}': array object tidak bisa disimpan ke npz")
+    arrays["__meta__"] = np.asarray(json.dumps({"versi": versi, "tipe": tipe}))
+
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+def muat_npz(path, versi=""):
+    """Kebalikan simpan_npz. Return None jika versi berbeda (entri basi)."""
+    with np.load(path, allow_pickle=False) as z:
+        meta = json.loads(z["__meta__"].item())
+        if meta["versi"] != versi:
+            return None
+        out = {}
+        for k, t in meta["tipe"].items():
+            if t[0] == "df":
+                out[k] = pd.DataFrame({c: z[f"{k}/{i}"] for i, c in enumerate(t[1])})
+            elif t[0] == "list":
+                out[k] = z[k].tolist()
+            else:
+                v = z[k]
+                out[k] = v.item() if v.ndim == 0 else v
+    return out
+
+# ==========================================
+# CACHE HASIL: LRU MEMORI + TIER DISK OPSIONAL
+# ==========================================
+class ResultCache:
+    """
+    Cache hasil berbasis konten (key = hash_stabil(...)).
+    - Tier memori: LRU dibatasi total ukuran (bytes), bukan jumlah entri.
+    - Tier disk (opsional): file .npz per key, dibatasi ukuran folder, evict berdasarkan
+      waktu akses tertua. Hanya nilai dict yang bisa diserialisasi yang ditulis ke disk.
+    - versi: stempel versi; entri disk dengan versi lain dianggap basi.
+    """
+    def __init__(self, maks_bytes=256 * 2**20, folder_disk=None, maks_bytes_disk=2**30, versi="1"):
+        self.maks_bytes = maks_bytes
+        self.folder_disk = folder_disk
+        self.maks_bytes_disk = maks_bytes_disk
+        self.versi = str(versi)
+        self._mem = OrderedDict() # key -> (value, size)
+        self._total = 0
+        self._lock = threading.Lock()
+        self.stats = {"hit_mem": 0, "hit_disk": 0, "miss": 0}
+        if folder_disk:
+            os.makedirs(folder_disk, exist_ok=True)
+
+    def __len__(self):
+        return len(self._mem)
+
+    def __contains__(self, key):
+        return key in self._mem or (self._path(key) is not None and os.path.exists(self._path(key)))
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def _path(self, key):
+        if not self.folder_disk:
+            return None
+        return os.path.join(self.folder_disk, f"{key}.npz")
+
+    def _simpan_mem(self, key, value, size):
+        with self._lock:
+            if key in self._mem:
+                self._total -= self._mem.pop(key)[1]
+            if size > self.maks_bytes:
+                return # Terlalu besar untuk tier memori
+            self._mem[key] = (value, size)
+            self._total += size
+            while self._total > self.maks_bytes:
+                _, (_, s) = self._mem.popitem(last=False)
+                self._total -= s
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.stats["hit_mem"] += 1
+                return self._mem[key][0]
+
+        path = self._path(key)
+        if path is not None and os.path.exists(path):
+            try:
+                value = muat_npz(path, self.versi)
+            except Exception:
+                value = None # File rusak / format lama
+            if value is None:
+                self._hapus_file(path)
+            else:
+                os.utime(path) # Tandai baru diakses (untuk evict disk)
+                self._simpan_mem(key, value, ukuran_bytes(value))
+                self.stats["hit_disk"] += 1
+                return value
+
+        self.stats["miss"] += 1
+        return default
+
+    def put(self, key, value, disk=True):
+        self._simpan_mem(key, value, ukuran_bytes(value))
+        path = self._path(key)
+        if disk and path is not None and isinstance(value, dict):
+            try:
+                simpan_npz(path, value, self.versi)
+            except (TypeError, ValueError, OSError):
+                return value # Tetap tersedia di tier memori
+            self._evict_disk()
+        return value
+
+    def get_or_compute(self, key, fungsi, disk=True):
+        """Ambil dari cache, atau hitung fungsi() lalu simpan"""
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, fungsi(), disk=disk)
+        return value
+
+    @staticmethod
+    def _hapus_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        entri = []
+        with os.scandir(self.folder_disk) as it:
+            for e in it:
+                if e.name.endswith(".npz"):
+                    st_ = e.stat()
+                    entri.append((st_.st_mtime, st_.st_size, e.path))
+        total = sum(s for _, s, _ in entri)
+        for _, s, path in sorted(entri):
+            if total <= self.maks_bytes_disk:
+                break
+            self._hapus_file(path)
+            total -= s
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._mem.clear()
+            self._total = 0
+        if disk and self.folder_disk:
+            for nama in os.listdir(self.folder_disk):
+                if nama.endswith(".npz"):
+                    self._hapus_file(os.path.join(self.folder_disk, nama))
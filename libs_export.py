@@ -1,19 +1,261 @@
 import pandas as pd
-from io import BytesIO
+from io import BytesIO, StringIO
 import numpy as np
+import xlsxwriter
+
+class DXF_Writer:
+    """
+    Penulis DXF streaming: entitas diformat dari template siap pakai lalu dikirim per blok
+    (writelines) ke sink file-like (StringIO, file, response) - tanpa `content += ...`.
+    sink=None -> entitas ditampung per blok dan diambil lewat generator blok().
+    presisi: jumlah desimal koordinat (None = repr float penuh).
+    polyline: persegi ditulis sebagai 1 POLYLINE tertutup (bukan 4 LINE) + header versi R12.
+    Seluruh entitas memakai semantik R12 (AC1009), sehingga tidak butuh TABLES / handle.
+    Simbol berulang (penampang kolom, besi) didefinisikan sekali di seksi BLOCKS lalu
+    ditempatkan dengan INSERT (lihat header(simbol) & insert_massal).
+    """
+    TPL_LINE = "0\nLINE\n8\n{}\n10\n{}\n20\n{}\n30\n0.0\n11\n{}\n21\n{}\n31\n0.0\n"
+    TPL_TEXT = "0\nTEXT\n8\n{}\n10\n{}\n20\n{}\n30\n0.0\n40\n{}\n1\n{}\n"
+    TPL_CIRCLE = "0\nCIRCLE\n8\n{}\n10\n{}\n20\n{}\n30\n0.0\n40\n{}\n"
+    TPL_POLY4 = ("0\nPOLYLINE\n8\n{}\n66\n1\n10\n0.0\n20\n0.0\n30\n0.0\n70\n1\n" +
+                 "0\nVERTEX\n8\n{}\n10\n{}\n20\n{}\n30\n0.0\n" * 4 + "0\nSEQEND\n8\n{}\n")
+    TPL_INSERT = "0\nINSERT\n8\n{}\n2\n{}\n10\n{}\n20\n{}\n30\n0.0\n"
+    TPL_BLOCK = "0\nBLOCK\n8\n0\n2\n{}\n70\n0\n10\n0.0\n20\n0.0\n30\n0.0\n3\n{}\n"
+    TPL_ENDBLK = "0\nENDBLK\n8\n0\n"
+    SEKSI_BLOCKS = "0\nSECTION\n2\nBLOCKS\n"
+    TUTUP_SEKSI = "0\nENDSEC\n"
+    HEADER_VERSI = "0\nSECTION\n2\nHEADER\n9\n$ACADVER\n1\nAC1009\n0\nENDSEC\n"
+    HEADER = "0\nSECTION\n2\nENTITIES\n"
+    FOOTER = "0\nENDSEC\n0\nEOF"
+    KOSONG = ""
+
+    def __init__(self, sink=None, ukuran_blok=20000, presisi=None, polyline=False):
+        self.sink = sink
+        self.ukuran_blok = ukuran_blok
+        self.presisi = presisi
+        self.polyline = polyline
+        self._buf = []
+        self._siap = [] # Blok yang sudah penuh (mode generator)
+
+    def _kode(self, tpl):
+        """Template tanpa placeholder -> teks siap tulis"""
+        return tpl
+
+    def _awal(self):
+        return self.HEADER_VERSI if self.polyline else ""
+
+    def header(self, simbol=None):
+        """Awal file: [header versi] + [seksi BLOCKS] + pembuka seksi ENTITIES"""
+        return self._awal() + self._seksi_blocks(simbol) + self._kode(self.HEADER)
+
+    def footer(self):
+        return self._kode(self.FOOTER)
+
+    def _seksi_blocks(self, simbol):
+        """
+        simbol: dict {nama BLOCK: fungsi(writer)} yang menggambar isi simbol relatif
+        terhadap titik dasar (0, 0). Digambar dengan template yang sama (ASCII / biner).
+        """
+        if not simbol:
+            return self.KOSONG
+        sub = self.__class__(None, 1 << 30, self.presisi, self.polyline)
+        sub.tulis_massal(self.SEKSI_BLOCKS)
+        for nama, gambar in simbol.items():
+            sub.tulis_massal(self.TPL_BLOCK, nama, nama)
+            gambar(sub)
+            sub.tulis_massal(self.TPL_ENDBLK)
+        sub.tulis_massal(self.TUTUP_SEKSI)
+        sub.flush()
+        return self.KOSONG.join(sub.blok())
+
+    def tulis(self, teks):
+        """Tambah satu entitas (string terformat)"""
+        self._buf.append(teks)
+        if len(self._buf) >= self.ukuran_blok:
+            self.flush()
+
+    def tulis_banyak(self, daftar):
+        """Tambah banyak entitas sekaligus (list / iterable string)"""
+        self._buf.extend(daftar)
+        if len(self._buf) >= self.ukuran_blok:
+            self.flush()
+
+    def flush(self):
+        if not self._buf:
+            return
+        if self.sink is not None:
+            self.sink.writelines(self._buf)
+        else:
+            self._siap.append(self.KOSONG.join(self._buf))
+        self._buf = []
+
+    def blok(self):
+        """Ambil blok teks yang sudah siap (mode sink=None)"""
+        siap, self._siap = self._siap, []
+        return siap
+
+    # --- Entitas massal (vektor) ---
+    def _teks(self, v):
+        """Kolom nilai -> array object berisi str (repr float terpendek, sama dengan f-string)"""
+        if np.ndim(v) == 0:
+            if self.presisi is not None and isinstance(v, float):
+                v = round(v, self.presisi)
+            return str(v)
+        arr = np.asarray(v)
+        if self.presisi is not None and arr.dtype.kind == 'f':
+            arr = np.round(arr, self.presisi) # Repr float yang dibulatkan jauh lebih pendek
+        out = np.empty(arr.shape, dtype=object)
+        out[...] = list(map(str, arr.tolist())) # str(float) Python lebih cepat dari astype(str)
+        return out
+
+    def tulis_massal(self, tpl, *kolom):
+        """
+        Format banyak entitas sekaligus: template dipecah di '{}' lalu disambung
+        per kolom dengan operasi array (tanpa loop Python per entitas).
+        kolom: array (n,) atau skalar, sesuai urutan placeholder template.
+        """
+        bagian = tpl.split("{}")
+        hasil = bagian[0]
+        for nilai, konst in zip(kolom, bagian[1:]):
+            hasil = hasil + self._teks(nilai) + konst
+        if np.ndim(hasil) == 0:
+            self.tulis(hasil)
+        else:
+            self.tulis_banyak(hasil.tolist())
+
+    def line_massal(self, x1, y1, x2, y2, layer="STRUKTUR"):
+        self.tulis_massal(self.TPL_LINE, layer, x1, y1, x2, y2)
+
+    def rect_massal(self, cx, cy, b, h, layer="KOLOM"):
+        """Persegi untuk banyak titik tengah; sudut dihitung dengan broadcasting"""
+        cx, cy = np.atleast_1d(np.asarray(cx, dtype=float)), np.atleast_1d(np.asarray(cy, dtype=float))
+        dx, dy = np.broadcast_to(b, cx.shape) / 2, np.broadcast_to(h, cx.shape) / 2
+        x = np.stack([cx - dx, cx + dx, cx + dx, cx - dx], axis=1) # (n, 4) sudut p1..p4
+        y = np.stack([cy - dy, cy - dy, cy + dy, cy + dy], axis=1)
+        if self.polyline:
+            vertex = [v for i in range(4) for v in (layer, x[:, i], y[:, i])]
+            self.tulis_massal(self.TPL_POLY4, layer, *vertex, layer)
+            return
+        x2, y2 = np.roll(x, -1, axis=1), np.roll(y, -1, axis=1) # p1->p2, ..., p4->p1
+        self.line_massal(x.ravel(), y.ravel(), x2.ravel(), y2.ravel(), layer)
+
+    def text_massal(self, x, y, text, height=0.2, layer="TEXT"):
+        self.tulis_massal(self.TPL_TEXT, layer, x, y, height, text)
+
+    def circle_massal(self, x, y, radius, layer="BESI"):
+        self.tulis_massal(self.TPL_CIRCLE, layer, x, y, radius)
+
+    def insert_massal(self, x, y, nama, layer="0"):
+        """Tempatkan BLOCK `nama` (harus sudah didefinisikan di header) di banyak titik"""
+        self.tulis_massal(self.TPL_INSERT, layer, nama, x, y)
+
+    # --- Entitas dasar (satu per panggilan) ---
+    line = line_massal
+    rect = rect_massal
+    text = text_massal
+    circle = circle_massal
+    insert = insert_massal
+
+class DXF_BinaryWriter(DXF_Writer):
+    """
+    Binary DXF R12 (group code 1 byte, 255 + int16 untuk kode >= 255, koordinat float64
+    little-endian, string null-terminated). Header AC1009 selalu ditulis agar pembaca tahu
+    lebar group code.
+    Template ASCII yang sama diterjemahkan menjadi record numpy berukuran tetap,
+    sehingga satu blok entitas = satu array terstruktur -> tobytes().
+    Sink harus biner (BytesIO / file 'wb'); nilai string (layer, teks) harus skalar.
+    """
+    SENTINEL = b"AutoCAD Binary DXF\r\n\x1a\x00"
+    KOSONG = b""
+
+    def __init__(self, sink=None, ukuran_blok=20000, presisi=None, polyline=False):
+        super().__init__(sink, ukuran_blok, presisi, polyline)
+        self._tag = {} # Cache template -> [(group code, konstanta / None)]
+
+    @staticmethod
+    def _jenis(kode):
+        """Tipe nilai biner menurut rentang group code DXF"""
+        if kode < 10 or 100 <= kode < 110 or 300 <= kode < 370 or 390 <= kode < 400 or 410 <= kode < 420 or 999 <= kode < 1010:
+            return "str"
+        if kode < 60 or 110 <= kode < 150 or 210 <= kode < 240 or 460 <= kode < 470 or 1010 <= kode < 1060:
+            return "<f8"
+        if 90 <= kode < 100 or 420 <= kode < 430 or 440 <= kode < 460 or kode == 1071:
+            return "<i4"
+        if 290 <= kode < 300:
+            return "<i1"
+        return "<i2"
+
+    def _parse(self, tpl):
+        if tpl not in self._tag:
+            baris = tpl.rstrip("\n").split("\n")
+            self._tag[tpl] = [(int(k), None if v == "{}" else v) for k, v in zip(baris[::2], baris[1::2])]
+        return self._tag[tpl]
+
+    def _kodekan(self, tpl, kolom=()):
+        tag = self._parse(tpl)
+        n = max([np.size(k) for k in kolom if np.ndim(k)] or [1])
+        it = iter(kolom)
+        fields, nilai = [], []
+        for i, (kode, konst) in enumerate(tag):
+            v = next(it) if konst is None else konst
+            jenis = self._jenis(kode)
+            if jenis == "str":
+                if np.ndim(v):
+                    raise TypeError(f"Nilai string group {kode} harus skalar untuk binary DXF")
+                v = str(v).encode("cp1252", "replace") + b"\x00"
+                jenis = f"S{len(v)}"
+            elif jenis != "<f8":
+                v = np.asarray(v).astype(int) if np.ndim(v) else int(float(v))
+            elif np.ndim(v) == 0:
+                v = float(v)
+            if kode < 255:
+                fields += [(f"k{i}", "u1"), (f"v{i}", jenis)]
+                nilai += [kode, v]
+            else:
+                fields += [(f"x{i}", "u1"), (f"k{i}", "<i2"), (f"v{i}", jenis)]
+                nilai += [255, kode, v]
+        rec = np.empty(n, dtype=fields)
+        for (nama, _), v in zip(fields, nilai):
+            rec[nama] = v
+        return rec.tobytes()
+
+    def _kode(self, tpl):
+        return self._kodekan(tpl)
+
+    def _awal(self):
+        return self.SENTINEL + self._kodekan(self.HEADER_VERSI)
+
+    def tulis_massal(self, tpl, *kolom):
+        self.tulis(self._kodekan(tpl, kolom))
 
 class Export_Engine:
-    def __init__(self):
-        pass
+    def __init__(self, format_dxf="ascii", presisi=None, polyline=False, pakai_blok=True):
+        """
+        format_dxf: "ascii" (default) atau "binary".
+        presisi: desimal koordinat ASCII (misal 4 = 0.1 mm), None = float penuh.
+        polyline: persegi kolom/pondasi sebagai POLYLINE R12 tertutup.
+        pakai_blok: simbol berulang sebagai BLOCK + INSERT (False = semua entitas digambar ulang).
+        """
+        self.format_dxf = format_dxf
+        self.presisi = presisi
+        self.polyline = polyline
+        self.pakai_blok = pakai_blok
+
+    def _writer(self, sink=None, ukuran_blok=20000):
+        kelas = DXF_BinaryWriter if self.format_dxf == "binary" else DXF_Writer
+        return kelas(sink, ukuran_blok, self.presisi, self.polyline)
+
+    def _buffer(self):
+        return BytesIO() if self.format_dxf == "binary" else StringIO()
 
     def _dxf_header(self):
-        return "0\nSECTION\n2\nENTITIES\n"
+        return DXF_Writer.HEADER
 
     def _dxf_footer(self):
-        return "0\nENDSEC\n0\nEOF"
+        return DXF_Writer.FOOTER
 
     def _dxf_line(self, x1, y1, x2, y2, layer="STRUKTUR"):
-        return f"0\nLINE\n8\n{layer}\n10\n{x1}\n20\n{y1}\n30\n0.0\n11\n{x2}\n21\n{y2}\n31\n0.0\n"
+        return DXF_Writer.TPL_LINE.format(layer, x1, y1, x2, y2)
 
     def _dxf_rect(self, cx, cy, b, h, layer="KOLOM"):
         # cx, cy adalah titik tengah
@@ -33,84 +275,260 @@ class Export_Engine:
         return s
 
     def _dxf_text(self, x, y, text, height=0.2, layer="TEXT"):
-        return f"0\nTEXT\n8\n{layer}\n10\n{x}\n20\n{y}\n30\n0.0\n40\n{height}\n1\n{text}\n"
+        return DXF_Writer.TPL_TEXT.format(layer, x, y, height, text)
 
     def _dxf_circle(self, x, y, radius, layer="BESI"):
-        return f"0\nCIRCLE\n8\n{layer}\n10\n{x}\n20\n{y}\n30\n0.0\n40\n{radius}\n"
+        return DXF_Writer.TPL_CIRCLE.format(layer, x, y, radius)
+
+    # --- STREAMING: generator blok teks / tulis ke sink ---
+    def _stream(self, rencana, sink=None, ukuran_blok=20000):
+        """
+        rencana: (simbol, isi) - definisi BLOCK + fungsi isi(writer) penulis entitas.
+        sink file-like -> ditulis langsung (return None); sink None -> generator blok teks.
+        """
+        if sink is not None:
+            simbol, isi = rencana
+            w = self._writer(sink, ukuran_blok)
+            sink.write(w.header(simbol))
+            for _ in isi(w) or ():
+                pass
+            w.flush()
+            sink.write(w.footer())
+            return None
+        return self._iter_stream(rencana, ukuran_blok)
+
+    def _iter_stream(self, rencana, ukuran_blok):
+        simbol, isi = rencana
+        w = self._writer(None, ukuran_blok)
+        yield w.header(simbol)
+        for _ in isi(w) or ():
+            yield from w.blok() # isi() generator: blok dilepas selama proses berjalan
+        w.flush()
+        yield from w.blok()
+        yield w.footer()
+
+    def _kelompok_bim(self, df):
+        """
+        Klasifikasi elemen denah sekali jalan (mask per kategori, prioritas sama seperti
+        dispatch lama: Kolom -> Balok ber-as -> Dinding ber-as -> Balok titik -> Dinding titik).
+        """
+        tipe = df["Type"].astype(str)
+        sisa = df["Type"].notna().to_numpy()
+        if {"X1", "X2"} <= set(df.columns):
+            ada_axis = (df["X1"].notna() & df["X2"].notna()).to_numpy()
+        else:
+            ada_axis = np.zeros(len(df), dtype=bool)
+        is_kolom = tipe.str.contains("Column", regex=False).to_numpy()
+        is_balok = tipe.str.contains("Beam", regex=False).to_numpy()
+        is_dinding = tipe.str.contains("Wall", regex=False).to_numpy()
+
+        grup = {}
+        for nama, mask in [("kolom", is_kolom), ("balok_as", is_balok & ada_axis),
+                           ("dinding_as", is_dinding & ada_axis), ("balok", is_balok),
+                           ("dinding", is_dinding)]:
+            grup[nama] = mask & sisa
+            sisa = sisa & ~mask
+        return grup
+
+    @staticmethod
+    def _simbol_kolom(b, h):
+        """Penampang kolom b x h (+ tag) berpusat di titik dasar BLOCK"""
+        def gambar(w):
+            w.rect(0.0, 0.0, b, h, layer="S-KOLOM")
+            w.text(0.0, 0.0, "K1", height=0.15, layer="S-TAG")
+        return gambar
+
+    def _isi_bim(self, df_structure):
+        """
+        Entitas denah BIM secara massal: DataFrame dikelompokkan sekali per kategori,
+        tiap layer diformat dengan operasi string vektor per potongan ukuran blok writer.
+        pakai_blok: tiap ukuran penampang kolom unik menjadi satu BLOCK, kolom = INSERT.
+        Output: (simbol, isi) untuk _stream.
+        """
+        if df_structure is None or df_structure.empty:
+            return None, lambda w: None
+        df = df_structure
+        grup = self._kelompok_bim(df)
+
+        def kolom(nama, mask, default=None):
+            if nama not in df.columns:
+                return np.full(int(mask.sum()), default, dtype=float)
+            v = df[nama].to_numpy()[mask]
+            if default is not None:
+                v = np.where(pd.isna(v), default, v).astype(float)
+            return v
+
+        # Kolom: profil dari IFC (b, h), default kotak 40x40cm
+        m = grup["kolom"]
+        xk, yk = kolom("X", m), kolom("Y", m)
+        bk, hk = kolom("b", m, 0.4), kolom("h", m, 0.4)
+        simbol, nama_simbol = {}, []
+        if self.pakai_blok and len(xk):
+            ukuran, id_simbol = np.unique(np.stack([bk, hk], axis=1), axis=0, return_inverse=True)
+            id_simbol = id_simbol.ravel()
+            for i, (b, h) in enumerate(ukuran):
+                nama = f"KOLOM_{b*1000:.0f}x{h*1000:.0f}"
+                if nama in simbol:
+                    nama = f"{nama}_{i}" # Beda di bawah 1 mm
+                simbol[nama] = self._simbol_kolom(float(b), float(h))
+                nama_simbol.append(nama)
+
+        def isi(w):
+            n_blok = max(1, w.ukuran_blok)
+            if nama_simbol:
+                for i, nama in enumerate(nama_simbol):
+                    sel = np.flatnonzero(id_simbol == i)
+                    for j in range(0, len(sel), n_blok):
+                        sl = sel[j:j + n_blok]
+                        w.insert_massal(xk[sl], yk[sl], nama, layer="S-KOLOM")
+                        yield
+            else:
+                for i in range(0, len(xk), n_blok):
+                    sl = slice(i, i + n_blok)
+                    w.rect_massal(xk[sl], yk[sl], bk[sl], hk[sl], layer="S-KOLOM")
+                    w.text_massal(xk[sl], yk[sl], "K1", height=0.15, layer="S-TAG")
+                    yield
+
+            # Balok & dinding dengan garis as dari titik ujung sebenarnya
+            for nama, layer in [("balok_as", "S-BALOK"), ("dinding_as", "A-DINDING")]:
+                m = grup[nama]
+                x1, y1, x2, y2 = (kolom(k, m) for k in ("X1", "Y1", "X2", "Y2"))
+                for i in range(0, len(x1), n_blok):
+                    sl = slice(i, i + n_blok)
+                    w.line_massal(x1[sl], y1[sl], x2[sl], y2[sl], layer=layer)
+                    yield
+
+            # Balok tanpa titik ujung: tanda cross (+); dinding tanpa titik ujung: titik kecil
+            m = grup["balok"]
+            x, y = kolom("X", m), kolom("Y", m)
+            for i in range(0, len(x), n_blok):
+                xs, ys = x[i:i + n_blok], y[i:i + n_blok]
+                w.line_massal(xs - 0.2, ys, xs + 0.2, ys, layer="S-BALOK")
+                w.line_massal(xs, ys - 0.2, xs, ys + 0.2, layer="S-BALOK")
+                yield
+
+            m = grup["dinding"]
+            x, y = kolom("X", m), kolom("Y", m)
+            for i in range(0, len(x), n_blok):
+                w.circle_massal(x[i:i + n_blok], y[i:i + n_blok], 0.05, layer="A-DINDING")
+                yield
+        return simbol, isi
+
+    def write_bim_dxf(self, df_structure, sink=None, ukuran_blok=20000):
+        """
+        Denah BIM streaming. sink file-like -> ditulis per blok (memori terbatas),
+        sink None -> generator blok teks (misal untuk response streaming).
+        """
+        return self._stream(self._isi_bim(df_structure), sink, ukuran_blok)
 
     def generate_bim_dxf(self, df_structure):
         """
         [NEW] Generate Denah Struktur dari Data BIM (IFC)
         df_structure: DataFrame hasil parsing libs_bim_importer
+        Jika kolom geometri (X1..Y2, b, h) tersedia dan terisi: kolom digambar sesuai
+        dimensi profil, balok & dinding sebagai garis as dari titik ujung sebenarnya.
         """
-        content = self._dxf_header()
-        
-        if df_structure is not None and not df_structure.empty:
-            count = 0
-            for idx, row in df_structure.iterrows():
-                try:
-                    tipe = row['Type']
-                    x = row['X']
-                    y = row['Y']
-                    # Z tidak dipakai untuk denah 2D
-                    
-                    if "Column" in tipe:
-                        # Gambar Kolom sebagai Kotak 40x40cm (Default jika dimensi tidak terbaca)
-                        # Idealnya dimensi dibaca dari properti, tapi untuk visualisasi cepat kita standarisasi
-                        content += self._dxf_rect(x, y, 0.4, 0.4, layer="S-KOLOM")
-                        content += self._dxf_text(x, y, "K1", height=0.15, layer="S-TAG")
-                        
-                    elif "Beam" in tipe:
-                        # Balok agak susah digambar tanpa koordinat start/end yang jelas (saat ini kita cuma punya titik tengah)
-                        # Kita beri tanda cross (+) saja sebagai indikasi balok
-                        content += self._dxf_line(x-0.2, y, x+0.2, y, layer="S-BALOK")
-                        content += self._dxf_line(x, y-0.2, x, y+0.2, layer="S-BALOK")
-                    
-                    elif "Wall" in tipe:
-                        # Dinding sebagai garis panjang (Estimasi)
-                        # Diplot sebagai titik kecil memanjang
-                        content += self._dxf_circle(x, y, 0.05, layer="A-DINDING")
-                        
-                    count += 1
-                except:
-                    continue
-                    
-        content += self._dxf_footer()
-        return content
+        out = self._buffer() # bytes jika format_dxf="binary"
+        self.write_bim_dxf(df_structure, out)
+        return out.getvalue()
+
+    def _isi_detail(self, drawing_type, params):
+        simbol = {}
+        if drawing_type == "BALOK" and self.pakai_blok:
+            r_besi = params['dia'] / 2000
+            nama_besi = f"BESI_D{params['dia']:g}"
+            simbol[nama_besi] = lambda w: w.circle(0.0, 0.0, r_besi, "BESI")
+
+        def isi(w):
+            if drawing_type == "BALOK":
+                b = params['b'] / 1000; h = params['h'] / 1000; dia = params['dia'] / 1000
+                # Beton
+                w.rect(b/2, h/2, b, h, layer="STRUKTUR") # Sudut (0,0)-(b,h)
+                # Tulangan
+                selimut = 0.04; y_pos = selimut + 0.01 + dia/2
+                if simbol:
+                    w.insert(np.array([selimut+0.01, b-selimut-0.01]), y_pos, nama_besi, "BESI") # Kiri & kanan
+                else:
+                    w.circle(selimut+0.01, y_pos, dia/2, "BESI") # Kiri
+                    w.circle(b-selimut-0.01, y_pos, dia/2, "BESI") # Kanan
+                w.text(b/2-0.1, -0.2, f"{int(params['n'])} D{int(params['dia'])}")
+
+            elif drawing_type == "FOOTPLATE":
+                B = params['B']
+                w.rect(B/2, B/2, B, B, layer="STRUKTUR")
+                w.text(B/2-0.2, -0.2, f"Pondasi {B}x{B}m")
+
+            elif drawing_type == "TALUD":
+                H = params['H']; Ba = params['Ba']; Bb = params['Bb']
+                w.line(0, 0, Bb, 0); w.line(Bb, 0, Bb, H); w.line(Bb, H, Bb-Ba, H); w.line(Bb-Ba, H, 0, 0)
+                w.text(Bb/2, -0.5, f"Talud H={H}m")
+        return simbol, isi
+
+    def write_dxf(self, drawing_type, params, sink=None):
+        """Versi streaming create_dxf (sink file-like atau generator blok teks)"""
+        return self._stream(self._isi_detail(drawing_type, params), sink)
 
     # --- FUNGSI LAMA (TETAP DIPERTAHANKAN UNTUK KOMPATIBILITAS) ---
     def create_dxf(self, drawing_type, params):
-        dxf = self._dxf_header()
-
-        if drawing_type == "BALOK":
-            b = params['b'] / 1000; h = params['h'] / 1000; dia = params['dia'] / 1000
-            # Beton
-            dxf += self._dxf_line(0, 0, b, 0) + self._dxf_line(b, 0, b, h) + self._dxf_line(b, h, 0, h) + self._dxf_line(0, h, 0, 0)
-            # Tulangan
-            selimut = 0.04; y_pos = selimut + 0.01 + dia/2
-            dxf += self._dxf_circle(selimut+0.01, y_pos, dia/2, "BESI") # Kiri
-            dxf += self._dxf_circle(b-selimut-0.01, y_pos, dia/2, "BESI") # Kanan
-            dxf += self._dxf_text(b/2-0.1, -0.2, f"{int(params['n'])} D{int(params['dia'])}")
-
-        elif drawing_type == "FOOTPLATE":
-            B = params['B']
-            dxf += self._dxf_line(0, 0, B, 0) + self._dxf_line(B, 0, B, B) + self._dxf_line(B, B, 0, B) + self._dxf_line(0, B, 0, 0)
-            dxf += self._dxf_text(B/2-0.2, -0.2, f"Pondasi {B}x{B}m")
-
-        elif drawing_type == "TALUD":
-            H = params['H']; Ba = params['Ba']; Bb = params['Bb']
-            dxf += self._dxf_line(0, 0, Bb, 0) + self._dxf_line(Bb, 0, Bb, H) + self._dxf_line(Bb, H, Bb-Ba, H) + self._dxf_line(Bb-Ba, H, 0, 0)
-            dxf += self._dxf_text(Bb/2, -0.5, f"Talud H={H}m")
-            
-        dxf += self._dxf_footer()
-        return dxf
-
-    def create_excel_report(self, df_rab, session_data):
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df_rab.to_excel(writer, sheet_name='RAB Final', index=False)
-            
+        out = self._buffer()
+        self.write_dxf(drawing_type, params, out)
+        return out.getvalue()
+
+    # --- EXCEL STREAMING (XlsxWriter constant_memory) ---
+    @staticmethod
+    def baris_kolom(data, ukuran_potong=10000):
+        """
+        Generator baris (tuple nilai Python) dari data kolom: DataFrame atau dict {nama: array}.
+        Dikonversi per potongan dengan tolist(); NaN -> None (sel kosong seperti to_excel).
+        """
+        if isinstance(data, pd.DataFrame):
+            kolom = [data[c].to_numpy() for c in data.columns]
+        else:
+            kolom = [np.asarray(v) for v in data.values()]
+        if not kolom:
+            return
+        for i in range(0, len(kolom[0]), ukuran_potong):
+            potong = []
+            for a in kolom:
+                a = a[i:i + ukuran_potong]
+                if a.dtype.kind == 'f' and np.isnan(a).any():
+                    a = np.where(np.isnan(a), None, a)
+                potong.append(a.tolist())
+            yield from zip(*potong)
+
+    def write_excel_stream(self, sink, lembar):
+        """
+        Tulis workbook baris demi baris (constant_memory: hanya 1 baris per sheet di memori).
+        sink: path / file-like biner. lembar: iterable (nama_sheet, header, iterable_baris);
+        baris boleh berasal dari generator - tidak perlu DataFrame perantara.
+        """
+        wb = xlsxwriter.Workbook(sink, {'constant_memory': True})
+        fmt_header = wb.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}) # Sama dgn pandas
+        for nama, header, baris in lembar:
+            ws = wb.add_worksheet(nama)
+            ws.write_row(0, 0, list(header), fmt_header)
+            for r, row in enumerate(baris, start=1):
+                ws.write_row(r, 0, row)
+        wb.close()
+        return sink
+
+    def create_excel_report(self, df_rab, session_data, lembar_tambahan=None):
+        """
+        Laporan RAB (.xlsx). lembar_tambahan: dict {nama_sheet: DataFrame | dict kolom |
+        (header, iterable_baris)} - misal jadwal penulangan & kuantitas per elemen.
+        """
+        lembar = [
+            ('RAB Final', list(df_rab.columns), self.baris_kolom(df_rab)),
             # Sheet Data Teknis
-            tech_data = {'Parameter': ['Mutu Beton', 'Mutu Baja'], 'Nilai': [f"{session_data.get('fc',0)} MPa", f"{session_data.get('fy',0)} MPa"]}
-            pd.DataFrame(tech_data).to_excel(writer, sheet_name='Data Teknis', index=False)
+            ('Data Teknis', ['Parameter', 'Nilai'],
+             [('Mutu Beton', f"{session_data.get('fc',0)} MPa"), ('Mutu Baja', f"{session_data.get('fy',0)} MPa")]),
+        ]
+        for nama, data in (lembar_tambahan or {}).items():
+            if isinstance(data, tuple):
+                lembar.append((nama, data[0], data[1]))
+            else:
+                lembar.append((nama, list(data.keys()) if isinstance(data, dict) else list(data.columns),
+                               self.baris_kolom(data)))
+        output = BytesIO()
+        self.write_excel_stream(output, lembar)
         return output.getvalue()
@@ -0,0 +1,497 @@
+import time
+import numpy as np
+import scipy.linalg as sla
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from scipy.sparse.csgraph import connected_components
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+import libs_grid as grid
+
+# Sparse Cholesky (CHOLMOD) dipakai jika scikit-sparse terpasang, fallback ke SuperLU
+try:
+    from sksparse.cholmod import cholesky as cholmod_cholesky
+except ImportError:
+    cholmod_cholesky = None
+
+# ==========================================
+# ENGINE ANALISA RANGKA RUANG 3D (6 DOF / NODE)
+# ==========================================
+class Frame3D_Engine:
+    """
+    Analisa Rangka Ruang (Space Frame) metode kekakuan langsung.
+    - 6 DOF per node (Ux, Uy, Uz, Rx, Ry, Rz)
+    - Matriks kekakuan global disusun sebagai Sparse Matrix (COO -> CSR)
+    - Diselesaikan dengan faktorisasi Sparse Cholesky (CHOLMOD) / LU (SuperLU)
+      sekali untuk seluruh model
+    Satuan: kN, m. Mutu beton fc dalam MPa.
+    """
+    N_STASIUN = 11 # Jumlah titik diagram gaya dalam per elemen
+
+    def __init__(self, materials):
+        self.materials = materials # fc, fy
+        self.E = 4700 * np.sqrt(materials['fc']) * 1000 # MPa -> kPa (kN/m2)
+        self.G = self.E / (2 * (1 + 0.2)) # Poisson beton = 0.2
+        self.K = None
+        self.lu = None
+        self.woodbury = None # Koreksi low-rank terhadap faktorisasi terakhir
+        self.t_faktor = None # Statistik waktu (detik) untuk memilih update vs refaktor
+        self.t_per_rhs = None
+
+    # ------------------------------------------
+    # 1. GEOMETRI & MATRIKS ELEMEN (VECTORIZED)
+    # ------------------------------------------
+    @staticmethod
+    def _sumbu_lokal(p1, p2):
+        """Matriks rotasi R (m,3,3): baris = sumbu lokal x, y, z dalam koordinat global"""
+        dx = p2 - p1
+        L = np.linalg.norm(dx, axis=1)
+        ex = dx / L[:, None]
+        # Referensi: sumbu Z global, kecuali elemen vertikal (kolom) pakai sumbu X global
+        vertikal = np.abs(ex[:, 2]) > 0.999
+        ref = np.zeros_like(ex)
+        ref[~vertikal, 2] = 1.0
+        ref[vertikal, 0] = 1.0
+        ez = np.cross(ex, ref)
+        ez /= np.linalg.norm(ez, axis=1)[:, None]
+        ey = np.cross(ez, ex)
+        return np.stack([ex, ey, ez], axis=1), L
+
+    @staticmethod
+    def _properti_penampang(b, h):
+        """A, Iy (sumbu lemah), Iz (sumbu kuat), J (torsi St. Venant persegi)"""
+        A = b * h
+        Iz = b * h**3 / 12
+        Iy = h * b**3 / 12
+        a = np.maximum(b, h); c = np.minimum(b, h)
+        J = a * c**3 * (1/3 - 0.21 * (c / a) * (1 - c**4 / (12 * a**4)))
+        return A, Iy, Iz, J
+
+    def _kekakuan_lokal(self, L, A, Iy, Iz, J):
+        """Matriks kekakuan lokal 12x12 untuk m elemen sekaligus -> (m,12,12)"""
+        m = len(L)
+        E, G = self.E, self.G
+        k = np.zeros((m, 12, 12))
+        EA = E * A / L; GJ = G * J / L
+        z12 = 12 * E * Iz / L**3; z6 = 6 * E * Iz / L**2; z4 = 4 * E * Iz / L; z2 = 2 * E * Iz / L
+        y12 = 12 * E * Iy / L**3; y6 = 6 * E * Iy / L**2; y4 = 4 * E * Iy / L; y2 = 2 * E * Iy / L
+
+        entri = [
+            (0, 0, EA), (0, 6, -EA), (6, 6, EA),
+            (3, 3, GJ), (3, 9, -GJ), (9, 9, GJ),
+            # Lentur bidang lokal x-y (momen Mz)
+            (1, 1, z12), (1, 5, z6), (1, 7, -z12), (1, 11, z6),
+            (5, 5, z4), (5, 7, -z6), (5, 11, z2),
+            (7, 7, z12), (7, 11, -z6), (11, 11, z4),
+            # Lentur bidang lokal x-z (momen My)
+            (2, 2, y12), (2, 4, -y6), (2, 8, -y12), (2, 10, -y6),
+            (4, 4, y4), (4, 8, y6), (4, 10, y2),
+            (8, 8, y12), (8, 10, y6), (10, 10, y4),
+        ]
+        for i, j, val in entri:
+            k[:, i, j] = val
+            k[:, j, i] = val
+        return k
+
+    @staticmethod
+    def _transformasi(R):
+        """T (m,12,12) = blockdiag(R, R, R, R)"""
+        m = len(R)
+        T = np.zeros((m, 12, 12))
+        for blk in range(4):
+            s = slice(3 * blk, 3 * blk + 3)
+            T[:, s, s] = R
+        return T
+
+    # ------------------------------------------
+    # 2. PERAKITAN MATRIKS GLOBAL (SPARSE)
+    # ------------------------------------------
+    def build(self, nodes, elements, support_z=None, rakit_kekakuan=True):
+        """
+        Menyusun model dari struct_nodes / struct_elements.
+        support_z: elevasi tumpuan jepit (default: level terendah model)
+        rakit_kekakuan=False: hanya geometri (sumbu lokal) untuk plot hasil dari cache, tanpa K
+        """
+        self.store = nodes if isinstance(nodes, grid.NodeStore) else grid.NodeStore(nodes)
+        self.elements = elements.reset_index(drop=True)
+        n_node = len(self.store)
+        self.n_dof = 6 * n_node
+
+        i1 = self.store.offsets(self.elements['Start'].to_numpy())
+        i2 = self.store.offsets(self.elements['End'].to_numpy())
+        p1, p2 = self.store.xyz[i1], self.store.xyz[i2]
+        self.R, self.L = self._sumbu_lokal(p1, p2)
+        if not rakit_kekakuan:
+            return self
+        self.T = self._transformasi(self.R)
+
+        b = self.elements['b'].to_numpy(dtype=float)
+        h = self.elements['h'].to_numpy(dtype=float)
+        self.k_lokal = self._kekakuan_lokal(self.L, *self._properti_penampang(b, h))
+        k_global = np.einsum('mji,mjk,mkl->mil', self.T, self.k_lokal, self.T)
+
+        # Peta DOF elemen (m,12): node1 DOF 0..5, node2 DOF 0..5
+        dof6 = np.arange(6)
+        self.dof_el = np.hstack([6 * i1[:, None] + dof6, 6 * i2[:, None] + dof6])
+        rows = np.repeat(self.dof_el, 12, axis=1).ravel()
+        cols = np.tile(self.dof_el, (1, 12)).ravel()
+        self.K = sp.coo_matrix((k_global.ravel(), (rows, cols)), shape=(self.n_dof, self.n_dof)).tocsr()
+
+        # Tumpuan jepit: semua DOF node pada elevasi dasar dikunci
+        if support_z is None:
+            support_z = self.store.Z.min()
+        fixed_node = np.isclose(self.store.Z, support_z)
+        self.fixed = np.repeat(fixed_node, 6)
+        self.free = np.flatnonzero(~self.fixed)
+        self.posisi_free = np.full(self.n_dof, -1)
+        self.posisi_free[self.free] = np.arange(len(self.free))
+        self.lu = None
+        self.woodbury = None
+        return self
+
+    def factorize(self):
+        """Faktorisasi K bebas (K_ff) - cukup sekali per kekakuan"""
+        t0 = time.perf_counter()
+        K_ff = self.K[self.free][:, self.free].tocsc()
+        self.K_faktor = self.K.copy() # K saat difaktorkan (basis koreksi Woodbury)
+        self.woodbury = None
+        if cholmod_cholesky is not None:
+            self.lu = cholmod_cholesky(K_ff)
+        else:
+            # K simetris positif definit: urutan MMD(A'+A) tanpa pivot baris
+            self.lu = spla.splu(K_ff, permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0.0,
+                                options=dict(SymmetricMode=True))
+        self.t_faktor = time.perf_counter() - t0
+        return self.lu
+
+    def _solve_faktor(self, P_ff):
+        """Substitusi maju-mundur terhadap faktorisasi tersimpan"""
+        if self.lu is None:
+            self.factorize()
+        t0 = time.perf_counter()
+        x = self.lu(P_ff) if cholmod_cholesky is not None else self.lu.solve(P_ff)
+        n_rhs = 1 if np.ndim(P_ff) == 1 else np.shape(P_ff)[1]
+        self.t_per_rhs = (time.perf_counter() - t0) / max(n_rhs, 1)
+        return x
+
+    def solve_ff(self, P_ff):
+        """
+        Solve K_ff x = P_ff untuk DOF bebas (vektor atau matriks multi-RHS).
+        Jika ada perubahan penampang sejak faktorisasi terakhir, dikoreksi dengan
+        Sherman-Morrison-Woodbury: (K0 + U D U')^-1 = K0^-1 - Z D (I + U'Z D)^-1 U' K0^-1
+        """
+        x = self._solve_faktor(P_ff)
+        if self.woodbury is None:
+            return x
+        idx, Z, D, M_lu = self.woodbury
+        t = sla.lu_solve(M_lu, x[idx])
+        return x - Z @ (D @ t)
+
+    # ------------------------------------------
+    # 2b. RE-ANALISA INKREMENTAL (PERUBAHAN PENAMPANG)
+    # ------------------------------------------
+    def update_sections(self, elements):
+        """
+        Perbarui b/h elemen tanpa menyusun ulang model.
+        K diperbarui dengan delta kekakuan elemen yang berubah saja; faktorisasi lama
+        dipertahankan dan dikoreksi low-rank (Woodbury) selama jumlah DOF terdampak
+        lebih murah daripada faktorisasi ulang.
+        Return: 'tetap' | 'woodbury' | 'refaktor' | 'rebuild' (topologi berbeda -> build ulang)
+        """
+        elements = elements.reset_index(drop=True)
+        if (len(elements) != len(self.elements) or
+                not np.array_equal(elements['Start'].to_numpy(), self.elements['Start'].to_numpy()) or
+                not np.array_equal(elements['End'].to_numpy(), self.elements['End'].to_numpy())):
+            self.build(self.store, elements)
+            return 'rebuild'
+
+        b = elements['b'].to_numpy(dtype=float)
+        h = elements['h'].to_numpy(dtype=float)
+        ubah = np.flatnonzero((b != self.elements['b'].to_numpy(dtype=float)) |
+                              (h != self.elements['h'].to_numpy(dtype=float)))
+        if len(ubah) == 0:
+            return 'tetap'
+
+        # Delta kekakuan global hanya untuk elemen yang berubah
+        k_baru = self._kekakuan_lokal(self.L[ubah], *self._properti_penampang(b[ubah], h[ubah]))
+        T = self.T[ubah]
+        dk = np.einsum('mji,mjk,mkl->mil', T, k_baru - self.k_lokal[ubah], T)
+        dof = self.dof_el[ubah]
+        rows = np.repeat(dof, 12, axis=1).ravel()
+        cols = np.tile(dof, (1, 12)).ravel()
+        self.K = self.K + sp.coo_matrix((dk.ravel(), (rows, cols)), shape=self.K.shape).tocsr()
+        self.k_lokal[ubah] = k_baru
+        self.elements.loc[ubah, 'b'] = b[ubah]
+        self.elements.loc[ubah, 'h'] = h[ubah]
+        if self.lu is None:
+            return 'refaktor'
+
+        # DOF bebas terdampak (kumulatif sejak faktorisasi terakhir)
+        idx_lama = self.woodbury[0] if self.woodbury is not None else np.empty(0, dtype=int)
+        pos = self.posisi_free[dof.ravel()]
+        idx = np.union1d(idx_lama, pos[pos >= 0])
+        n_baru = len(idx) - len(idx_lama)
+        if self.t_per_rhs is None or n_baru * self.t_per_rhs > 0.5 * self.t_faktor:
+            self.lu = None # Lebih murah faktorisasi ulang
+            return 'refaktor'
+
+        # Z = K0^-1 U, kolom lama dipakai ulang, hanya kolom DOF baru yang di-solve
+        Z = np.zeros((len(self.free), len(idx)))
+        baru = ~np.isin(idx, idx_lama)
+        if self.woodbury is not None:
+            Z[:, ~baru] = self.woodbury[1]
+        E = np.zeros((len(self.free), int(baru.sum())))
+        E[idx[baru], np.arange(baru.sum())] = 1.0
+        Z[:, baru] = np.asarray(self._solve_faktor(E)).reshape(len(self.free), -1)
+
+        # D = (K - K0) pada DOF terdampak (dalam ruang DOF bebas)
+        g = self.free[idx]
+        D = (self.K - self.K_faktor)[g][:, g].toarray()
+        M_lu = sla.lu_factor(np.eye(len(idx)) + Z[idx] @ D)
+        self.woodbury = (idx, Z, D, M_lu)
+        return 'woodbury'
+
+    # ------------------------------------------
+    # 3. BEBAN
+    # ------------------------------------------
+    def _beban_ekuivalen_lokal(self, w_global):
+        """
+        Gaya ujung ekuivalen (lokal) dari beban merata global per elemen.
+        w_global: (..., m, 3) beban per meter arah X, Y, Z global (kN/m)
+        """
+        w = np.einsum('mij,...mj->...mi', self.R, w_global) # (wx, wy, wz) lokal
+        L = self.L
+        f = np.zeros(w.shape[:-1] + (12,))
+        f[..., 0] = f[..., 6] = w[..., 0] * L / 2
+        f[..., 1] = f[..., 7] = w[..., 1] * L / 2
+        f[..., 5] = w[..., 1] * L**2 / 12
+        f[..., 11] = -w[..., 1] * L**2 / 12
+        f[..., 2] = f[..., 8] = w[..., 2] * L / 2
+        f[..., 4] = -w[..., 2] * L**2 / 12
+        f[..., 10] = w[..., 2] * L**2 / 12
+        return f, w
+
+    def beban_gravitasi(self, q_load):
+        """Beban merata gravitasi (kN/m, arah -Z) pada semua Balok (Type == 'Beam')"""
+        w_global = np.zeros((len(self.L), 3))
+        w_global[(self.elements['Type'] == 'Beam').to_numpy(), 2] = -q_load
+        return w_global
+
+    def beban_kasus(self, spec):
+        """
+        Terjemahkan 1 kasus beban menjadi (beban merata elemen, beban nodal).
+        spec: dict dengan kunci opsional
+          - 'q'  : beban merata gravitasi pada balok (kN/m)
+          - 'Fx' : gaya lateral arah X per joint di atas tumpuan (kN)
+          - 'Fy' : gaya lateral arah Y per joint di atas tumpuan (kN)
+          - 'P'  : array (n_node, 6) beban nodal langsung (kN, kNm)
+        """
+        w_global = self.beban_gravitasi(spec.get('q', 0.0))
+        P_nodal = np.zeros((len(self.store), 6))
+        joint = ~self.fixed[::6]
+        P_nodal[joint, 0] += spec.get('Fx', 0.0)
+        P_nodal[joint, 1] += spec.get('Fy', 0.0)
+        if spec.get('P') is not None:
+            P_nodal += np.asarray(spec['P'], dtype=float)
+        return w_global, P_nodal.ravel()
+
+    def vektor_beban(self, f_eq):
+        """Rakit vektor beban nodal global P dari gaya ekuivalen lokal (..., m, 12)"""
+        f_glob = np.einsum('mji,...mj->...mi', self.T, f_eq)
+        if f_glob.ndim == 2:
+            return np.bincount(self.dof_el.ravel(), weights=f_glob.ravel(), minlength=self.n_dof)
+        return np.stack([self.vektor_beban(f) for f in f_eq])
+
+    # ------------------------------------------
+    # 4. SOLVE & GAYA DALAM
+    # ------------------------------------------
+    def solve(self, q_load):
+        """Analisa seluruh model 3D untuk beban merata gravitasi q_load (kN/m) pada balok"""
+        return ambil_kasus(self.solve_cases({"Q": {"q": q_load}}), 0)
+
+    def solve_cases(self, load_cases):
+        """
+        Analisa banyak kasus beban (D, L, E, W, ...) dengan SATU faktorisasi K.
+        Semua kasus diselesaikan sebagai satu solve multi-RHS.
+        load_cases: dict {nama_kasus: spec} (lihat beban_kasus)
+        Output: dict hasil dengan sumbu pertama = kasus beban
+        """
+        nama = list(load_cases)
+        beban = [self.beban_kasus(load_cases[k]) for k in nama]
+        W = np.stack([w for w, _ in beban])
+        f_eq, w_lokal = self._beban_ekuivalen_lokal(W)
+        P = self.vektor_beban(f_eq) + np.stack([p for _, p in beban])
+
+        U = np.zeros((len(nama), self.n_dof))
+        U[:, self.free] = np.asarray(self.solve_ff(P[:, self.free].T)).T
+        res = self.hasil(U, P, f_eq, w_lokal)
+        res['Kasus'] = nama
+        return res
+
+    def hasil(self, U, P, f_eq, w_lokal):
+        """
+        Susun hasil analisa: displacement, reaksi, gaya ujung & diagram gaya dalam.
+        Mendukung sumbu batch di depan (kasus / kombinasi beban).
+        """
+        u_lokal = np.einsum('mij,...mj->...mi', self.T, U[..., self.dof_el])
+        f_ujung = np.einsum('mij,...mj->...mi', self.k_lokal, u_lokal) - f_eq
+        reaksi = (self.K @ U.reshape(-1, self.n_dof).T).T.reshape(U.shape) - P
+        reaksi[..., ~self.fixed] = 0.0
+
+        # Diagram momen (konvensi: positif = lentur positif / sagging)
+        s = np.linspace(0, 1, self.N_STASIUN)
+        x = self.L[:, None] * s[None, :]
+        Mz = -f_ujung[..., [5]] + f_ujung[..., [1]] * x + w_lokal[..., [1]] * x**2 / 2
+        My = -f_ujung[..., [4]] - f_ujung[..., [2]] * x - w_lokal[..., [2]] * x**2 / 2
+
+        return {
+            "Displacement": U.reshape(U.shape[:-1] + (-1, 6)),
+            "Reaksi": reaksi.reshape(U.shape[:-1] + (-1, 6)),
+            "Gaya_Ujung": f_ujung,
+            "N": -f_ujung[..., 0], # Tarik positif
+            "Mz": Mz,
+            "My": My,
+            "Mu_max": np.abs(Mz).max(axis=-1), # Sumbu kuat (M3, tinggi h)
+            "My_max": np.abs(My).max(axis=-1), # Sumbu lemah (M2, tinggi b)
+            "Stasiun": s,
+        }
+
+    @staticmethod
+    def kombinasi(res_kasus, tabel):
+        """
+        Kombinasi beban dengan superposisi linear hasil per kasus (tanpa solve ulang).
+        tabel: dict {nama_kombinasi: {nama_kasus: faktor}}, misal SNI_Load_1727.tabel_kombinasi()
+        Output: hasil per kombinasi (sumbu pertama = kombinasi) + envelope per elemen,
+        terpisah untuk sumbu kuat (Mu_env dari Mz) dan sumbu lemah (My_env dari My)
+        """
+        nama = list(tabel)
+        C = np.array([[tabel[k].get(c, 0.0) for c in res_kasus['Kasus']] for k in nama])
+        res = {key: np.tensordot(C, res_kasus[key], axes=1) for key in KUNCI_BATCH}
+        res['Mu_max'] = np.abs(res['Mz']).max(axis=-1)
+        res['My_max'] = np.abs(res['My']).max(axis=-1)
+        res['Stasiun'] = res_kasus['Stasiun']
+        res['Kombinasi'] = nama
+
+        # Envelope per elemen
+        res['Mz_env_max'] = res['Mz'].max(axis=0)
+        res['Mz_env_min'] = res['Mz'].min(axis=0)
+        res['My_env_max'] = res['My'].max(axis=0)
+        res['My_env_min'] = res['My'].min(axis=0)
+        res['N_env_max'] = res['N'].max(axis=0)
+        res['N_env_min'] = res['N'].min(axis=0)
+        res['Mu_env'] = res['Mu_max'].max(axis=0)
+        res['Kombinasi_Kritis'] = np.asarray(nama)[res['Mu_max'].argmax(axis=0)]
+        res['My_env'] = res['My_max'].max(axis=0)
+        res['Kombinasi_Kritis_My'] = np.asarray(nama)[res['My_max'].argmax(axis=0)]
+        return res
+
+    def offset_sisi_tarik(self, result):
+        """
+        Vektor global (m, stasiun, 3) ke arah serat tarik, panjang = besar momen.
+        Mz positif -> tarik di sisi -y lokal, My positif -> tarik di sisi +z lokal.
+        """
+        return (-self.R[:, None, 1, :] * result['Mz'][:, :, None] +
+                self.R[:, None, 2, :] * result['My'][:, :, None])
+
+# Stempel versi format hasil (naikkan jika formula / kunci hasil berubah -> cache lama basi)
+VERSI_HASIL = "frame3d-2"
+
+# Kunci hasil yang memiliki sumbu kasus / kombinasi beban di depan
+KUNCI_BATCH = ("Displacement", "Reaksi", "Gaya_Ujung", "N", "Mz", "My")
+
+def ambil_kasus(res, i):
+    """Ambil hasil 1 kasus / kombinasi (index i atau nama) dari hasil batch"""
+    if isinstance(i, str):
+        i = list(res.get('Kasus', res.get('Kombinasi'))).index(i)
+    out = {key: res[key][i] for key in KUNCI_BATCH}
+    out['Mu_max'] = np.abs(out['Mz']).max(axis=-1)
+    out['My_max'] = np.abs(out['My']).max(axis=-1)
+    out['Stasiun'] = res['Stasiun']
+    return out
+
+# ==========================================
+# CEK KONEKTIVITAS & TUMPUAN SEBELUM SOLVE
+# ==========================================
+def cek_stabilitas(nodes, elements, support_z=None):
+    """
+    Cek model sebelum solve (aturan tumpuan sama dengan Frame3D_Engine.build): node bebas
+    tanpa elemen dan bagian struktur tanpa tumpuan membuat K singular.
+    Output: list pesan (kosong = model bisa dianalisa).
+    """
+    store = nodes if isinstance(nodes, grid.NodeStore) else grid.NodeStore(nodes)
+    if len(store) == 0 or len(elements) == 0:
+        return ["Model kosong: tidak ada node / elemen untuk dianalisa."]
+    i1 = store.offsets(elements['Start'].to_numpy())
+    i2 = store.offsets(elements['End'].to_numpy())
+    n = len(store)
+    G = sp.coo_matrix((np.ones(len(i1)), (i1, i2)), shape=(n, n))
+    n_bagian, label = connected_components(G, directed=False)
+
+    if support_z is None:
+        support_z = store.Z.min()
+    tumpuan = np.isclose(store.Z, support_z)
+    terhubung = np.zeros(n, dtype=bool)
+    terhubung[i1] = terhubung[i2] = True
+    bertumpu = np.zeros(n_bagian, dtype=bool)
+    bertumpu[label[tumpuan]] = True
+
+    pesan = []
+    yatim = np.flatnonzero(~terhubung & ~tumpuan)
+    if len(yatim):
+        pesan.append(f"{len(yatim)} node tidak terhubung ke elemen mana pun "
+                     f"(ID: {', '.join(map(str, store.ids[yatim][:5]))}{', ...' if len(yatim) > 5 else ''}).")
+    melayang = ~bertumpu[label[i1]]
+    bagian = np.unique(label[i1][melayang])
+    if len(bagian):
+        id_el = elements['ID'].to_numpy()[melayang]
+        pesan.append(f"{len(bagian)} bagian struktur ({melayang.sum()} elemen) tidak terhubung ke tumpuan "
+                     f"di Z = {support_z:g} m (elemen: {', '.join(map(str, id_el[:5]))}"
+                     f"{', ...' if len(id_el) > 5 else ''}).")
+    return pesan
+
+# ==========================================
+# VISUALISASI PORTAL 2D DARI HASIL 3D
+# ==========================================
+def plot_portal(engine, result, mask, sumbu_normal, mode="Momen", skala=None):
+    """
+    Plot diagram momen / deformasi untuk elemen pada satu bidang (mask boolean elemen).
+    sumbu_normal: 1 = Portal X-Z (Tampak Depan), 0 = Portal Y-Z (Tampak Samping)
+    """
+    ax_h = 0 if sumbu_normal == 1 else 1 # Sumbu horizontal plot
+    idx = np.flatnonzero(mask)
+    p1 = engine.store.xyz[engine.store.offsets(engine.elements['Start'].to_numpy()[idx])]
+    p2 = engine.store.xyz[engine.store.offsets(engine.elements['End'].to_numpy()[idx])]
+    a = np.stack([p1[:, ax_h], p1[:, 2]], axis=1)
+    b = np.stack([p2[:, ax_h], p2[:, 2]], axis=1)
+
+    fig, ax = plt.subplots(figsize=(8, 5))
+    ax.add_collection(LineCollection(np.stack([a, b], axis=1), colors='k', lw=1.5))
+    if len(idx) == 0:
+        return fig
+
+    s = result['Stasiun']
+    titik = a[:, None, :] + (b - a)[:, None, :] * s[None, :, None]
+    if mode == "Momen":
+        # Momen digambar di sisi serat tarik (proyeksi ke bidang portal)
+        off = engine.offset_sisi_tarik(result)[idx][:, :, [ax_h, 2]]
+        M = np.linalg.norm(off, axis=2)
+        m_max = M.max()
+        skala = skala or (0.15 * np.ptp(np.vstack([a, b]), axis=0).max() / m_max if m_max > 0 else 1.0)
+        kurva = titik + off * skala
+        ax.add_collection(LineCollection(kurva, colors='tab:red', lw=1))
+        i_maks = np.unravel_index(M.argmax(), M.shape)
+        ax.annotate(f"{M[i_maks]:.1f} kNm", kurva[i_maks], color='tab:red', fontsize=8)
+        ax.set_title("Diagram Momen (kNm)")
+    else:
+        U = result['Displacement'][:, [ax_h, 2]]
+        d1 = U[engine.store.offsets(engine.elements['Start'].to_numpy()[idx])]
+        d2 = U[engine.store.offsets(engine.elements['End'].to_numpy()[idx])]
+        u_max = np.abs(U).max()
+        skala = skala or (0.1 * np.ptp(np.vstack([a, b]), axis=0).max() / u_max if u_max > 0 else 1.0)
+        ax.add_collection(LineCollection(np.stack([a + d1 * skala, b + d2 * skala], axis=1), colors='tab:blue', lw=1, linestyles='--'))
+        ax.set_title(f"Deformasi (skala x{skala:.0f}, maks {u_max * 1000:.2f} mm)")
+
+    ax.autoscale()
+    ax.set_aspect('equal')
+    ax.grid(True, linestyle=':')
+    return fig
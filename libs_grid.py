@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# GENERATOR MODEL RANGKA DARI GRID (X, Y, Z)
+# ==========================================
+def _ambil_section(sections, tipe):
+    """Ambil baris section pertama untuk tipe 'Kolom' / 'Balok' (b, h, Label)"""
+    sec = sections[sections['Type'] == tipe].iloc[0]
+    return sec['b (m)'], sec['h (m)'], sec['Label']
+
+def generate_grid_arrays(grid_x, grid_y, levels):
+    """
+    Membuat array Node & Elemen langsung dari Grid dengan aritmatika index (O(n)).
+    Node diurutkan Z -> Y -> X (ID mulai dari 1), sama seperti loop lama.
+    Output: dict berisi array numpy:
+      - node_id, X, Y, Z          (n_node,)
+      - col_start, col_end        (kolom: node -> node di level atasnya)
+      - bx_start, bx_end          (balok arah X, level Z != 0)
+      - by_start, by_end          (balok arah Y, level Z != 0)
+    """
+    gx = np.asarray(grid_x, dtype=float)
+    gy = np.asarray(grid_y, dtype=float)
+    gz = np.asarray(levels, dtype=float)
+    nx, ny, nz = len(gx), len(gy), len(gz)
+
+    # Index 3D (iz, iy, ix) -> ID = 1 + iz*ny*nx + iy*nx + ix
+    ids = np.arange(1, nx * ny * nz + 1, dtype=np.int64).reshape(nz, ny, nx)
+    Z, Y, X = np.meshgrid(gz, gy, gx, indexing='ij')
+
+    # Kolom: sambung ke level berikutnya (grid Z sudah terurut)
+    col_start = ids[:-1].ravel()
+    col_end = ids[1:].ravel()
+
+    # Balok hanya di level lantai (lewati pondasi Z=0)
+    lantai = ids[gz != 0]
+    bx_start = lantai[:, :, :-1].ravel()
+    bx_end = lantai[:, :, 1:].ravel()
+    by_start = lantai[:, :-1, :].ravel()
+    by_end = lantai[:, 1:, :].ravel()
+
+    return {
+        "node_id": ids.ravel(), "X": X.ravel(), "Y": Y.ravel(), "Z": Z.ravel(),
+        "col_start": col_start, "col_end": col_end,
+        "bx_start": bx_start, "bx_end": bx_end,
+        "by_start": by_start, "by_end": by_end,
+    }
+
+def generate_grid_frame(grid_x, grid_y, levels, sections):
+    """
+    Generate Kerangka Struktur (Kolom + Balok X/Y) dari Grid.
+    Pengganti loop iterrows() di tab 'Model 3D' main.py & integrated_bim.py.
+    Output: (df_nodes, df_elements) dengan kolom yang sama seperti sebelumnya.
+    """
+    arr = generate_grid_arrays(grid_x, grid_y, levels)
+    df_nodes = pd.DataFrame({"ID": arr['node_id'], "X": arr['X'], "Y": arr['Y'], "Z": arr['Z']})
+
+    n_col = len(arr['col_start'])
+    n_bx = len(arr['bx_start'])
+    n_by = len(arr['by_start'])
+    n_el = n_col + n_bx + n_by
+    if n_el == 0:
+        return df_nodes, pd.DataFrame()
+
+    b_k, h_k, lbl_k = _ambil_section(sections, 'Kolom')
+    b_b, h_b, lbl_b = _ambil_section(sections, 'Balok')
+
+    # Penomoran elemen berurutan: Kolom (C) -> Balok X (Bx) -> Balok Y (By)
+    eid = np.arange(1, n_el + 1).astype(str)
+    prefix = np.repeat(np.array(["C", "Bx", "By"]), [n_col, n_bx, n_by])
+    is_col = np.arange(n_el) < n_col
+
+    df_elements = pd.DataFrame({
+        "ID": np.char.add(prefix, eid),
+        "Type": np.where(is_col, "Column", "Beam"),
+        "Start": np.concatenate([arr['col_start'], arr['bx_start'], arr['by_start']]),
+        "End": np.concatenate([arr['col_end'], arr['bx_end'], arr['by_end']]),
+        "b": np.where(is_col, b_k, b_b),
+        "h": np.where(is_col, h_k, h_b),
+        "Sec": np.where(is_col, lbl_k, lbl_b),
+    })
+    return df_nodes, df_elements
+
+# ==========================================
+# NODE STORE (INDEX ID -> OFFSET + ARRAY XYZ)
+# ==========================================
+class NodeStore:
+    """
+    Penyimpanan Node berbasis array kontigu + hash index ID -> offset baris.
+    Pengganti pola `nodes[nodes['ID'] == el['Start']].iloc[0]` (scan penuh per ujung elemen).
+    """
+    def __init__(self, df_nodes):
+        self.ids = df_nodes['ID'].to_numpy()
+        self.index = pd.Index(self.ids)  # Hash table ID -> offset
+        self.xyz = np.ascontiguousarray(df_nodes[['X', 'Y', 'Z']].to_numpy(dtype=float))
+        self.X = self.xyz[:, 0]
+        self.Y = self.xyz[:, 1]
+        self.Z = self.xyz[:, 2]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def offsets(self, node_ids):
+        """ID Node (array) -> offset baris. Error jika ada ID yang tidak dikenal."""
+        off = self.index.get_indexer(np.asarray(node_ids))
+        if (off < 0).any():
+            missing = np.asarray(node_ids)[off < 0]
+            raise KeyError(f"Node ID tidak ditemukan: {missing[:5].tolist()}")
+        return off
+
+    def coords(self, node_id):
+        """Koordinat (X, Y, Z) untuk satu Node"""
+        x, y, z = self.xyz[self.index.get_loc(node_id)]
+        return x, y, z
+
+    def resolve_endpoints(self, elements):
+        """
+        Bulk lookup koordinat ujung untuk N elemen dalam satu gather.
+        Output: (p1, p2) masing-masing array (N, 3) [X, Y, Z]
+        """
+        if elements is None or len(elements) == 0:
+            return np.empty((0, 3)), np.empty((0, 3))
+        i1 = self.offsets(elements['Start'].to_numpy())
+        i2 = self.offsets(elements['End'].to_numpy())
+        return self.xyz[i1], self.xyz[i2]
+
+    def segments(self, elements, axes=(0, 1, 2)):
+        """
+        Segmen garis siap plot (LineCollection / Line3DCollection).
+        axes: index kolom koordinat, misal (0, 2) untuk portal X-Z, (0, 1) untuk denah.
+        Output: array (N, 2, len(axes))
+        """
+        p1, p2 = self.resolve_endpoints(elements)
+        axes = list(axes)
+        return np.stack([p1[:, axes], p2[:, axes]], axis=1)
@@ -1,46 +1,235 @@
+import time
 import pandas as pd
 import numpy as np
-import libs_sni as sni
+from libs_sni import SNI_Concrete_2847
 
 class BeamOptimizer:
+    # Batas ukuran blok (jumlah balok x kandidat) agar memori tetap kecil untuk model besar
+    MAKS_SEL_BLOK = 4_000_000
+
     def __init__(self, fc, fy, harga_satuan):
         self.fc = fc
         self.fy = fy
-        self.h_beton = harga_satuan.get('beton', 1100000)
+        self.h_beton = harga_satuan.get('beton', 1100000) # Rp/m3, atau dict {fc: Rp/m3}
         self.h_baja = harga_satuan.get('baja', 14000)
         self.h_bekisting = harga_satuan.get('bekisting', 150000)
 
-    def cari_dimensi_optimal(self, Mu_kNm, bentang_m):
+    def _harga_beton(self, fc):
+        if isinstance(self.h_beton, dict):
+            return self.h_beton[fc]
+        return self.h_beton
+
+    def kandidat(self, step=50, mutu=None, b_range=(200, 600), h_range=(300, 1000)):
+        """
+        Grid kandidat (fc, b, h) dengan filter geometri yang tidak bergantung beban:
+        h >= b dan h <= 3b. Output: dict array 1D (n_kandidat,), 'mutu' = index fc pada daftar mutu
+        (urut naik). Kandidat tersusun per mutu: kolom = mutu * n_geometri + index (b, h).
+        """
+        mutu = [self.fc] if mutu is None else sorted(mutu)
+        I, B, H = np.meshgrid(np.arange(len(mutu)),
+                              np.arange(b_range[0], b_range[1] + 1, step),
+                              np.arange(h_range[0], h_range[1] + 1, step), indexing='ij')
+        ok = (H >= B) & (H <= 3 * B)
+        I, B, H = I[ok], B[ok], H[ok]
+        FC = np.asarray(mutu, dtype=float)[I]
+
+        ds = SNI_Concrete_2847.DS
+        d = H - ds
+        # Komponen biaya per meter yang tidak bergantung Mu
+        harga_beton = np.array([self._harga_beton(fc) for fc in mutu], dtype=float)
+        biaya_tetap = ((B / 1000) * (H / 1000) * harga_beton[I] +
+                       (2 * (H / 1000) + (B / 1000)) * self.h_bekisting)
+        return {"fc": FC, "b": B, "h": H, "d": d, "ds": ds, "mutu": I, "daftar_mutu": mutu,
+                "n_geometri": int(ok[0].sum()), "biaya_tetap": biaya_tetap}
+
+    def _kebutuhan_tulangan(self, kd, Mu, lebar='b', tinggi='h'):
+        """
+        As perlu (balok x kandidat) via SNI_Concrete_2847.kebutuhan_tulangan, per mutu beton.
+        Sumbu lemah: lebar='h', tinggi='b'.
+        """
+        As = np.empty((len(Mu), len(kd['b'])))
+        for i, fc in enumerate(kd['daftar_mutu']):
+            kol = np.flatnonzero(kd['mutu'] == i)
+            As[:, kol] = SNI_Concrete_2847(fc, self.fy).kebutuhan_tulangan(
+                Mu, kd[lebar][kol], kd[tinggi][kol], kd['ds'])
+        return As
+
+    def cari_dimensi_batch(self, Mu_kNm, bentang_m, top_k=3, step=50, mutu=None, My_kNm=None):
+        """
+        Optimasi dimensi seluruh balok sekaligus (vectorized, tanpa loop kandidat).
+        Mu_kNm, bentang_m: array (n_balok,). Output: dict array (n_balok, top_k) berisi
+        b, h, fc, As, Biaya, Rho (%), diurutkan termurah. Slot tanpa solusi: Biaya = inf.
+        Tiap b x h muncul sekali (mutu termurahnya); biaya sama -> mutu lebih rendah didahulukan.
+        Untuk beberapa mutu, harga beton sebaiknya per mutu (dict {fc: Rp/m3}); dengan harga
+        tunggal mutu tinggi selalu menang atau seri.
+        My_kNm (opsional): momen sumbu lemah; kandidat juga harus memenuhi rasio tulangan
+        maksimum pada sumbu lemah (biaya tetap dihitung dari tulangan sumbu kuat).
+        """
+        Mu = np.atleast_1d(np.abs(np.asarray(Mu_kNm, dtype=float)))
+        L = np.broadcast_to(np.asarray(bentang_m, dtype=float), Mu.shape)
+        My = None if My_kNm is None else np.broadcast_to(np.abs(np.asarray(My_kNm, dtype=float)), Mu.shape)
+        kd = self.kandidat(step, mutu)
+        n, m = len(Mu), len(kd['b'])
+        n_geo, n_mutu = kd['n_geometri'], len(kd['daftar_mutu'])
+        k = min(top_k, n_geo)
+
+        out = {key: np.zeros((n, k)) for key in ("b", "h", "fc", "As", "Biaya", "Rho")}
+        out['Biaya'][:] = np.inf
+        if m == 0:
+            return out
+
+        blok = max(1, self.MAKS_SEL_BLOK // m)
+        for s in range(0, n, blok):
+            mu, l = Mu[s:s + blok, None], L[s:s + blok, None]
+
+            As = self._kebutuhan_tulangan(kd, mu)
+            rho = As / (kd['b'] * kd['d'])
+            biaya = kd['biaya_tetap'] + (As * 7850 / 1e6 * 1.3) * self.h_baja
+
+            # Mask kelayakan: tinggi minimum bentang/15 & rasio tulangan maksimum
+            layak = (kd['h'] >= np.maximum(300, np.floor(l * 1000 / 15))) & (rho <= 0.025)
+            if My is not None:
+                As_y = self._kebutuhan_tulangan(kd, My[s:s + blok, None], lebar='h', tinggi='b')
+                layak &= (kd['b'] > kd['ds']) & (As_y / (kd['h'] * (kd['b'] - kd['ds'])) <= 0.025)
+            biaya = np.where(layak, biaya, np.inf)
+
+            # Satu kandidat per b x h: mutu termurah (argmin -> seri jatuh ke mutu terendah)
+            biaya_mutu = biaya.reshape(len(mu), n_mutu, n_geo)
+            kolom = biaya_mutu.argmin(axis=1) * n_geo + np.arange(n_geo)
+            biaya_geo = np.take_along_axis(biaya, kolom, axis=1)
+
+            # Top-k tanpa sort penuh: argpartition O(n_geo), lalu urutkan k terpilih saja
+            # (kunci sekunder fc: biaya seri -> mutu lebih rendah lebih dulu)
+            pilih = (np.argpartition(biaya_geo, k - 1, axis=1)[:, :k] if k < n_geo
+                     else np.tile(np.arange(n_geo), (len(mu), 1)))
+            idx = np.take_along_axis(kolom, pilih, axis=1)
+            urut = np.lexsort((kd['fc'][idx], np.take_along_axis(biaya, idx, axis=1)), axis=1)
+            idx = np.take_along_axis(idx, urut, axis=1)
+
+            baris = np.arange(len(mu))[:, None]
+            out['Biaya'][s:s + blok] = biaya[baris, idx]
+            out['As'][s:s + blok] = As[baris, idx]
+            out['Rho'][s:s + blok] = rho[baris, idx] * 100
+            for key in ("b", "h", "fc"):
+                out[key][s:s + blok] = kd[key][idx]
+        return out
+
+    def cari_dimensi_optimal(self, Mu_kNm, bentang_m, top_k=3, step=50, mutu=None):
         """Mencari dimensi b x h yang paling murah namun Aman"""
-        options = []
-        range_b = range(200, 650, 50)
-        h_min_rec = int(bentang_m * 1000 / 15) 
-        range_h = range(max(300, h_min_rec), 1050, 50)
-        
-        engine_sni = sni.SNI_Concrete_2847(self.fc, self.fy)
-
-        for b in range_b:
-            for h in range_h:
-                if h < b: continue
-                if h > 3 * b: continue 
-                
-                ds = 40 + 10 + 6
-                try:
-                    As_req = engine_sni.kebutuhan_tulangan(Mu_kNm, b, h, ds)
-                except: continue
-                
-                d = h - ds
-                rho = As_req / (b * d)
-                if rho > 0.025: continue 
-                
-                vol_beton = (b/1000) * (h/1000) * 1.0
-                berat_baja = (As_req * 1.0 * 7850) / 1e6 * 1.3
-                luas_bekisting = (2 * (h/1000)) + (b/1000)
-                
-                biaya = (vol_beton * self.h_beton) + (berat_baja * self.h_baja) + (luas_bekisting * self.h_bekisting)
-                        
-                options.append({'b': b, 'h': h, 'As': As_req, 'Biaya': biaya, 'Rho': rho * 100})
-        
-        if not options: return None
-        df_opt = pd.DataFrame(options).sort_values(by='Biaya', ascending=True)
-        return df_opt.head(3).to_dict('records')
+        res = self.cari_dimensi_batch(Mu_kNm, bentang_m, top_k, step, mutu)
+        ok = np.isfinite(res['Biaya'][0])
+        if not ok.any(): return None
+        df_opt = pd.DataFrame({key: v[0][ok] for key, v in res.items()})
+        df_opt[['b', 'h']] = df_opt[['b', 'h']].astype(int)
+        return df_opt.to_dict('records')
+
+# ==========================================
+# OPTIMASI GRUP PENAMPANG SATU GEDUNG
+# ==========================================
+class ProjectOptimizer:
+    """
+    Optimasi penampang balok seluruh gedung berbasis grup (section grouping).
+    Siklus: analisa 3D -> envelope Mu (sumbu kuat) & My (sumbu lemah) -> kelompokkan balok -> pilih penampang termurah per grup
+    -> analisa ulang HANYA jika kekakuan (b*h^3) berubah melebihi toleransi.
+    engine: libs_frame3d.Frame3D_Engine yang sudah di-build (dipakai ulang, update inkremental).
+    """
+    def __init__(self, fc, fy, harga_satuan, step=50, mutu=None):
+        self.fc = fc
+        self.fy = fy
+        self.harga = harga_satuan
+        self.step = step
+        self.mutu = mutu
+        self.optimizer = BeamOptimizer(fc, fy, harga_satuan)
+
+    @staticmethod
+    def kelompokkan(Mu, bentang, n_grup=10, toleransi_bentang=0.5):
+        """
+        Kelompokkan balok berdasarkan kelas bentang (dibulatkan ke toleransi_bentang m)
+        lalu kuantil Mu di dalam tiap kelas. Output: label grup (n_balok,) mulai 0.
+        """
+        Mu = np.abs(np.asarray(Mu, dtype=float))
+        kelas_L = np.round(np.asarray(bentang, dtype=float) / toleransi_bentang).astype(np.int64)
+        # Batas kuantil global -> kelas Mu (0..n_grup-1)
+        batas = np.unique(np.quantile(Mu, np.linspace(0, 1, n_grup + 1)[1:-1])) if len(Mu) else []
+        kelas_Mu = np.searchsorted(batas, Mu, side='left')
+        _, label = np.unique(np.stack([kelas_L, kelas_Mu], axis=1), axis=0, return_inverse=True)
+        return label.ravel()
+
+    def _evaluasi_grup(self, Mu_g, L_g, My_g):
+        """
+        Penampang termurah per grup (serial, vectorized). Jumlah grup kecil (kelas bentang x
+        kelas Mu), sehingga evaluasi hanya beberapa ms - lebih murah daripada start process pool.
+        """
+        res = self.optimizer.cari_dimensi_batch(Mu_g, L_g, top_k=1, step=self.step, mutu=self.mutu, My_kNm=My_g)
+        return {key: v[:, 0] for key, v in res.items()}
+
+    def optimasi(self, engine, load_cases, tabel_kombinasi, n_grup=10, toleransi=0.05, maks_iter=5):
+        """
+        Output dict:
+          - elements : tabel elemen dengan b, h (m) hasil optimasi + kolom 'Grup'
+          - grup     : DataFrame per grup (jumlah, panjang total, Mu & My desain, b, h, fc, As, biaya)
+          - riwayat  : DataFrame statistik waktu & biaya per iterasi
+          - konvergen: True jika perubahan kekakuan terakhir <= toleransi
+        """
+        el = engine.elements.copy()
+        balok = np.flatnonzero(el['Type'].to_numpy() == 'Beam')
+        L = engine.L[balok]
+        riwayat, konvergen, mode = [], False, 'build'
+
+        t0 = time.perf_counter()
+        res = engine.kombinasi(engine.solve_cases(load_cases), tabel_kombinasi)
+        t_analisa = time.perf_counter() - t0
+
+        for it in range(1, maks_iter + 1):
+            t0 = time.perf_counter()
+            Mu = res['Mu_env'][balok]
+            My = res['My_env'][balok]
+            label = self.kelompokkan(Mu, L, n_grup)
+            n_g = label.max() + 1 if len(label) else 0
+            # Desain grup: Mu, My & bentang maksimum anggota
+            Mu_g = np.full(n_g, -np.inf); np.maximum.at(Mu_g, label, Mu)
+            My_g = np.full(n_g, -np.inf); np.maximum.at(My_g, label, My)
+            L_g = np.full(n_g, -np.inf); np.maximum.at(L_g, label, L)
+            pilih = self._evaluasi_grup(Mu_g, L_g, My_g)
+            t_optimasi = time.perf_counter() - t0
+
+            # Grup tanpa solusi layak: penampang lama dipertahankan
+            layak = np.isfinite(pilih['Biaya'])
+            b_lama = el['b'].to_numpy(dtype=float)[balok]
+            h_lama = el['h'].to_numpy(dtype=float)[balok]
+            b_baru = np.where(layak[label], pilih['b'][label] / 1000, b_lama)
+            h_baru = np.where(layak[label], pilih['h'][label] / 1000, h_lama)
+
+            I_lama = b_lama * h_lama**3
+            dK = float(np.max(np.abs(b_baru * h_baru**3 - I_lama) / I_lama)) if len(balok) else 0.0
+            el.loc[balok, 'b'] = b_baru
+            el.loc[balok, 'h'] = h_baru
+
+            biaya = float(np.sum(np.where(layak, pilih['Biaya'], 0.0)[label] * L))
+            stat = {"Iterasi": it, "Grup": int(n_g), "Grup Gagal": int((~layak).sum()),
+                    "Biaya (Rp)": biaya, "Perubahan Kekakuan": dK,
+                    "Waktu Optimasi (s)": t_optimasi, "Waktu Analisa (s)": t_analisa, "Analisa": mode}
+
+            if dK <= toleransi:
+                konvergen = True
+                riwayat.append(stat)
+                break
+
+            # Kekakuan berubah signifikan -> redistribusi gaya, analisa ulang (inkremental)
+            t0 = time.perf_counter()
+            mode = engine.update_sections(el)
+            res = engine.kombinasi(engine.solve_cases(load_cases), tabel_kombinasi)
+            t_analisa = time.perf_counter() - t0
+            riwayat.append(stat)
+
+        el['Grup'] = -1
+        el.loc[balok, 'Grup'] = label
+        df_grup = pd.DataFrame({
+            "Grup": np.arange(n_g), "Jumlah": np.bincount(label, minlength=n_g),
+            "Panjang (m)": np.bincount(label, weights=L, minlength=n_g),
+            "Mu Desain (kNm)": Mu_g, "My Desain (kNm)": My_g, "Bentang Maks (m)": L_g,
+            "b (mm)": pilih['b'], "h (mm)": pilih['h'], "fc (MPa)": pilih['fc'],
+            "As (mm2)": pilih['As'], "Biaya (Rp/m)": pilih['Biaya'],
+        })
+        df_grup["Biaya Total (Rp)"] = df_grup["Biaya (Rp/m)"] * df_grup["Panjang (m)"]
+        return {"elements": el, "grup": df_grup, "riwayat": pd.DataFrame(riwayat), "konvergen": konvergen}
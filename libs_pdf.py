@@ -1,12 +1,126 @@
 from fpdf import FPDF
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.textpath import TextToPath
+from matplotlib.font_manager import FontProperties
+from matplotlib.path import Path
+from functools import lru_cache
+import numpy as np
 import io
+import os
+import tempfile
 import datetime
+from concurrent.futures import ProcessPoolExecutor
+import libs_cache as cache
+
+try:
+    from PyPDF2 import PdfReader, PdfWriter
+except ImportError:
+    PdfReader = PdfWriter = None
 
 # Setting Matplotlib agar aman di Server (Non-GUI)
 plt.switch_backend('Agg')
 
+# ==========================================
+# CACHE GAMBAR RUMUS (MEMORI + DISK)
+# ==========================================
+# Versi render: hasil lama tidak dipakai jika matplotlib / cara render berubah
+VERSI_RUMUS = f"rumus-1-mpl{matplotlib.__version__}"
+
+# Rumus standar laporan (dirender sekali saat startup lewat prerender_rumus)
+RUMUS_STANDAR = [
+    r"M_u = \frac{1}{8} q_u L^2",
+    r"A_s = \frac{M_u}{\phi \cdot f_y \cdot (d - a/2)}",
+    r"V = C_s \cdot W = \frac{S_{DS}}{(R/I_e)} \cdot W",
+    r"M_n = A_s f_y (d - a/2)",
+]
+
+_CACHE_RUMUS = None
+
+def get_cache_rumus(folder=None):
+    """Cache gambar rumus bersama (satu per proses), tier disk di folder temp sistem"""
+    global _CACHE_RUMUS
+    if _CACHE_RUMUS is None:
+        folder = folder or os.path.join(tempfile.gettempdir(), "smartbim_cache", "rumus")
+        _CACHE_RUMUS = cache.ResultCache(maks_bytes=64 * 2**20, folder_disk=folder,
+                                         maks_bytes_disk=256 * 2**20, versi=VERSI_RUMUS)
+    return _CACHE_RUMUS
+
+def render_rumus_png(latex_str, dpi=150, figsize=(6, 1.5), fontsize=16):
+    """Render LaTeX (mathtext) -> PNG transparan (bytes). Figure tanpa pyplot (tanpa state global)."""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    fig.text(0.5, 0.5, f"${latex_str}$", fontsize=fontsize, ha='center', va='center')
+    fig.add_subplot().axis('off') # Sumbu tak terlihat: bbox & skala gambar sama seperti versi pyplot
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight', transparent=True)
+    return buf.getvalue()
+
+def rumus_png(latex_str, dpi=150, figsize=(6, 1.5), fontsize=16, hasil_cache=None):
+    """PNG rumus dari cache (key: latex, dpi, ukuran); render hanya jika belum ada"""
+    hasil_cache = hasil_cache or get_cache_rumus()
+    key = cache.hash_stabil("rumus", latex_str, dpi, list(figsize), fontsize)
+    data = hasil_cache.get_or_compute(
+        key, lambda: {"png": np.frombuffer(render_rumus_png(latex_str, dpi, figsize, fontsize), dtype=np.uint8)})
+    return data["png"].tobytes()
+
+_TEXT_TO_PATH = TextToPath()
+
+def rumus_path(latex_str, hasil_cache=None):
+    """
+    Outline glyph rumus (mathtext -> kurva vektor) dari cache.
+    Output: dict {"verts": (n, 2) dalam satuan FONT_SCALE (ukuran font 100 pt), "codes": (n,)}
+    """
+    hasil_cache = hasil_cache or get_cache_rumus()
+    key = cache.hash_stabil("rumus-vektor", latex_str)
+
+    def hitung():
+        verts, codes = _TEXT_TO_PATH.get_text_path(FontProperties(), f"${latex_str}$", ismath=True)
+        return {"verts": np.asarray(verts, dtype=float).reshape(-1, 2), "codes": np.asarray(codes, dtype=np.uint8)}
+    return hasil_cache.get_or_compute(key, hitung)
+
+@lru_cache(maxsize=512)
+def operator_rumus(latex_str, ukuran_font):
+    """
+    Operator path PDF (m/l/c/h, satuan pt, origin kiri-bawah rumus) untuk rumus pada ukuran_font.
+    Disusun sekali per (rumus, ukuran); penempatan cukup ditranslasi dengan operator 'cm'.
+    Output: (operator, lebar_pt, tinggi_pt)
+    """
+    data = rumus_path(latex_str)
+    codes = data["codes"]
+    v = data["verts"] * (ukuran_font / _TEXT_TO_PATH.FONT_SCALE) # FONT_SCALE @72 dpi -> pt
+    v = v - v.min(axis=0)
+    ops, i, n = [], 0, len(codes)
+    while i < n:
+        kode = codes[i]
+        if kode == Path.MOVETO:
+            ops.append(f"{v[i,0]:.2f} {v[i,1]:.2f} m"); i += 1
+        elif kode == Path.LINETO:
+            ops.append(f"{v[i,0]:.2f} {v[i,1]:.2f} l"); i += 1
+        elif kode == Path.CURVE3:
+            # Kuadratik -> kubik (PDF hanya punya Bezier kubik)
+            p0, q, p2 = v[i-1], v[i], v[i+1]
+            c1, c2 = p0 + 2/3 * (q - p0), p2 + 2/3 * (q - p2)
+            ops.append(f"{c1[0]:.2f} {c1[1]:.2f} {c2[0]:.2f} {c2[1]:.2f} {p2[0]:.2f} {p2[1]:.2f} c"); i += 2
+        elif kode == Path.CURVE4:
+            ops.append(" ".join(f"{a:.2f}" for a in v[i:i+3].ravel()) + " c"); i += 3
+        else: # CLOSEPOLY
+            ops.append("h"); i += 1
+    lebar, tinggi = v.max(axis=0)
+    return "\n".join(ops), float(lebar), float(tinggi)
+
+def prerender_rumus(daftar=None, dpi=150, figsize=(6, 1.5), fontsize=16, hasil_cache=None):
+    """Isi cache (PNG & path vektor) untuk rumus yang sudah diketahui (dipanggil sekali saat startup)"""
+    for latex_str in (RUMUS_STANDAR if daftar is None else daftar):
+        rumus_png(latex_str, dpi, figsize, fontsize, hasil_cache)
+        rumus_path(latex_str, hasil_cache)
+
 class PDFReport(FPDF):
+    halaman_awal = 0 # Offset nomor halaman (potongan laporan batch yang digabung)
+    mode_rumus = "vektor" # "vektor" (path PDF, tajam di semua zoom) atau "raster" (PNG)
+
     def header(self):
         # 1. Judul / Kop Surat
         self.set_font('Arial', 'B', 14)
@@ -23,7 +137,7 @@ class PDFReport(FPDF):
         # Posisi 1.5 cm dari bawah
         self.set_y(-15)
         self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Halaman {self.page_no()}', 0, 0, 'C')
+        self.cell(0, 10, f'Halaman {self.page_no() + self.halaman_awal}', 0, 0, 'C')
 
     def chapter_title(self, label):
         # Judul Bab (misal: "I. Analisa Struktur")
@@ -42,20 +156,27 @@ class PDFReport(FPDF):
         """
         Trik: Mengubah string LaTeX menjadi Gambar PNG Transparan
         menggunakan Matplotlib, lalu ditempel ke PDF.
+        Gambar diambil dari cache (memori + disk), rumus yang sama tidak dirender ulang.
         """
-        # Buat Kanvas Kosong
-        fig = plt.figure(figsize=(6, 1.5))
-        # Tulis Rumus LaTeX di tengah
-        fig.text(0.5, 0.5, f"${latex_str}$", fontsize=16, ha='center', va='center')
-        plt.axis('off') # Hilangkan sumbu X/Y
-        
         # Simpan ke Buffer Memori (bukan file fisik)
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=150, bbox_inches='tight', transparent=True)
-        buf.seek(0)
-        plt.close(fig)
-        
-        return buf
+        return io.BytesIO(rumus_png(latex_str, dpi=150, figsize=(6, 1.5), fontsize=16))
+
+    def draw_math_formula(self, latex_str, x_tengah=70, ukuran_font=13, jarak=4):
+        """
+        Gambar rumus sebagai path vektor (outline glyph mathtext) langsung di PDF:
+        tanpa gambar raster, ukuran file kecil & tajam di semua zoom.
+        x_tengah: posisi tengah rumus (mm), ukuran_font dalam pt. Kursor turun setinggi rumus.
+        _out melewati auto page break fpdf, jadi batas halaman dicek manual.
+        """
+        ops, lebar, tinggi = operator_rumus(latex_str, ukuran_font)
+        if self.will_page_break(tinggi / self.k + 2 * jarak):
+            self.add_page()
+        x0 = x_tengah * self.k - lebar / 2 # pt
+        y_atas = self.get_y() + jarak # mm dari atas halaman
+        y0 = (self.h - y_atas) * self.k - tinggi # pt, PDF dari bawah
+        # q..Q: simpan/pulihkan state grafis; fill hitam aturan nonzero (outline glyph)
+        self._out(f"q 0 g 1 0 0 1 {x0:.2f} {y0:.2f} cm\n{ops}\nf Q")
+        self.set_y(y_atas + tinggi / self.k + jarak)
 
     def add_math_block(self, title, formula, result):
         """
@@ -64,12 +185,15 @@ class PDFReport(FPDF):
         self.set_font('Arial', 'B', 10)
         self.cell(0, 8, title, 0, 1)
         
-        # Render Rumus jadi Gambar
-        img_buf = self.render_math_formula(formula)
-        
-        # Tempel Gambar ke PDF (Trik FPDF baca BytesIO)
-        # x=None (center), w=0 (auto width scale)
-        self.image(img_buf, x=20, w=100) 
+        if self.mode_rumus == "vektor":
+            self.draw_math_formula(formula)
+        else:
+            # Render Rumus jadi Gambar
+            img_buf = self.render_math_formula(formula)
+            
+            # Tempel Gambar ke PDF (Trik FPDF baca BytesIO)
+            # x=None (center), w=0 (auto width scale)
+            self.image(img_buf, x=20, w=100) 
         
         self.set_font('Arial', '', 10)
         self.multi_cell(0, 5, f"Hasil: {result}")
@@ -179,3 +303,180 @@ def create_professional_report(session_state):
 
     # Output ke Bytes (Fixed for FPDF2)
     return bytes(pdf.output())
+
+
+# ==============================================================================
+# LAPORAN BATCH SELURUH ELEMEN (POOL PROSES + GABUNG POTONGAN PDF)
+# ==============================================================================
+RUMUS_AS = r"A_s = \frac{M_u}{\phi \cdot f_y \cdot (d - a/2)}"
+RUMUS_MN = r"\phi M_n = \phi A_s f_y (d - a/2)"
+
+BARIS_PER_HALAMAN = 35 # Mode ringkas: baris tabel per halaman
+ELEMEN_PER_POTONGAN = 100 # Mode lengkap: 1 halaman per elemen
+HALAMAN_PER_POTONGAN = 25 # Mode ringkas
+
+# (judul kolom, lebar mm, kunci data, format)
+KOLOM_RINGKAS = [
+    ("ID", 22, "ID", "{}"), ("Tipe", 20, "Type", "{}"), ("b x h (mm)", 26, "bh", "{}"),
+    ("Mu (kNm)", 22, "Mu", "{:.2f}"), ("As perlu (mm2)", 26, "As_req", "{:.0f}"),
+    ("Tulangan", 22, "Tulangan", "{}"), ("phi.Mn (kNm)", 26, "phi_Mn", "{:.2f}"), ("Status", 16, "Status", "{}"),
+]
+# Dengan sumbu lemah: kolom As perlu diganti pasangan (Mu, tulangan, phi.Mn) per sumbu
+KOLOM_RINGKAS_BIAKSIAL = [
+    ("ID", 18, "ID", "{}"), ("Tipe", 14, "Type", "{}"), ("b x h (mm)", 22, "bh", "{}"),
+    ("Mu3 (kNm)", 18, "Mu", "{:.2f}"), ("Tul. 3", 18, "Tulangan", "{}"), ("phi.Mn3", 18, "phi_Mn", "{:.2f}"),
+    ("Mu2 (kNm)", 18, "My", "{:.2f}"), ("Tul. 2", 18, "Tulangan_y", "{}"), ("phi.Mn2", 18, "phi_Mn_y", "{:.2f}"),
+    ("Status", 14, "Status", "{}"),
+]
+
+def _halaman_lengkap(pdf, d, i):
+    """Satu halaman lembar perhitungan untuk elemen ke-i"""
+    pdf.add_page()
+    pdf.chapter_title(f"Elemen {d['ID'][i]} ({d['Type'][i]})")
+    komb = f" (Kombinasi {d['Kombinasi'][i]})" if 'Kombinasi' in d else ""
+    teks = f"Dimensi Penampang : {d['bh'][i]} mm\nMomen Terfaktor Mu : {d['Mu'][i]:.2f} kNm{komb}"
+    if 'My' in d:
+        komb_y = f" (Kombinasi {d['Kombinasi_y'][i]})" if 'Kombinasi_y' in d else ""
+        teks += f"\nMomen Sumbu Lemah My : {d['My'][i]:.2f} kNm{komb_y}"
+    pdf.chapter_body(teks)
+    pdf.add_math_block(
+        "1. Kebutuhan Tulangan (As)", RUMUS_AS,
+        f"As perlu = {d['As_req'][i]:.0f} mm2 (As min = {d['As_min'][i]:.0f} mm2) -> dipasang {d['Tulangan'][i]}"
+    )
+    ok = d['OK'][i]
+    pdf.add_math_block(
+        "2. Kapasitas Momen", RUMUS_MN,
+        f"phi.Mn = {d['phi_Mn'][i]:.2f} kNm {'>=' if ok else '<'} Mu = {d['Mu'][i]:.2f} kNm -> {'OK' if ok else 'GAGAL'}"
+    )
+    if 'My' in d:
+        ok_y = d['OK_y'][i]
+        pdf.add_math_block(
+            "3. Lentur Sumbu Lemah (lebar h, tinggi b)", RUMUS_MN,
+            f"As perlu = {d['As_req_y'][i]:.0f} mm2 -> dipasang {d['Tulangan_y'][i]}; "
+            f"phi.Mn = {d['phi_Mn_y'][i]:.2f} kNm {'>=' if ok_y else '<'} My = {d['My'][i]:.2f} kNm "
+            f"-> {'OK' if ok_y else 'GAGAL'}"
+        )
+    if d['Status'][i] == "OK*":
+        pdf.chapter_body("Catatan: kolom hanya dicek lentur per sumbu, interaksi aksial-lentur (P-M) belum dicek.")
+
+def _halaman_ringkas(pdf, d, mulai, akhir):
+    """Tabel ringkas (tanpa gambar rumus), BARIS_PER_HALAMAN baris per halaman"""
+    for awal in range(mulai, akhir, BARIS_PER_HALAMAN):
+        pdf.add_page()
+        kolom = KOLOM_RINGKAS_BIAKSIAL if 'My' in d else KOLOM_RINGKAS
+        pdf.set_font('Arial', 'B', 9)
+        pdf.set_fill_color(200, 220, 255)
+        for judul, lebar, _, _ in kolom:
+            pdf.cell(lebar, 7, judul, border=1, align='C', fill=True)
+        pdf.ln()
+        pdf.set_font('Arial', '', 9)
+        for i in range(awal, min(awal + BARIS_PER_HALAMAN, akhir)):
+            gagal = d['Status'][i] == "GAGAL"
+            pdf.set_fill_color(255, 210, 210)
+            for _, lebar, kunci, fmt in kolom:
+                pdf.cell(lebar, 6, fmt.format(d[kunci][i]), border=1, align='C', fill=gagal)
+            pdf.ln()
+
+def _tulis_elemen(pdf, mode, d, mulai, akhir):
+    if mode == "lengkap":
+        for i in range(mulai, akhir):
+            _halaman_lengkap(pdf, d, i)
+    else:
+        _halaman_ringkas(pdf, d, mulai, akhir)
+
+def _render_potongan(args):
+    """Worker: render elemen [mulai, akhir) menjadi PDF terpisah (bytes)"""
+    mode, d, mulai, akhir, halaman_awal = args
+    pdf = PDFReport()
+    pdf.halaman_awal = halaman_awal
+    _tulis_elemen(pdf, mode, d, mulai, akhir)
+    return bytes(pdf.output())
+
+def _halaman_sampul(pdf, d, mode, info_proyek):
+    pdf.add_page()
+    pdf.chapter_title("I. LAPORAN DESAIN TULANGAN SELURUH ELEMEN")
+    n = len(d['ID'])
+    n_gagal = int(np.sum(d['Status'] == "GAGAL"))
+    tgl = datetime.datetime.now().strftime("%d %B %Y")
+    pdf.chapter_body(
+        f"Tanggal Laporan : {tgl}\n"
+        f"Standar Desain  : SNI 2847:2019 (Beton)\n"
+        f"Jumlah Elemen   : {n}\n"
+        f"Elemen Gagal    : {n_gagal}\n"
+        f"Format          : {'Lembar perhitungan per elemen' if mode == 'lengkap' else 'Tabel ringkas'}"
+        + ("\nOK* = kolom hanya dicek lentur per sumbu; interaksi aksial-lentur (P-M) belum dicek."
+           if np.any(d['Status'] == "OK*") else "")
+        + (f"\n{info_proyek}" if info_proyek else "")
+    )
+
+def create_batch_report(elemen, Mu, desain, dia=16, kombinasi=None, mode="ringkas",
+                        n_proses=None, info_proyek=None, My=None, desain_y=None, kombinasi_y=None):
+    """
+    Laporan perhitungan untuk N elemen dari hasil desain vektor (SNI_Concrete_2847.desain_tulangan_batch).
+    elemen: DataFrame (ID, Type, b, h dalam m); Mu: array momen envelope sumbu kuat (kNm).
+    My, desain_y, kombinasi_y (opsional): envelope & desain sumbu lemah; status OK bila kedua sumbu OK.
+    mode: "lengkap" (1 halaman + rumus per elemen) atau "ringkas" (tabel, tanpa gambar rumus).
+    Potongan halaman dirender paralel (pool proses) lalu digabung; tanpa PyPDF2 -> serial 1 dokumen.
+    """
+    n = len(elemen)
+    b_mm = np.round(elemen['b'].to_numpy(dtype=float) * 1000).astype(int)
+    h_mm = np.round(elemen['h'].to_numpy(dtype=float) * 1000).astype(int)
+    # Data ringkas berbasis array (murah dikirim ke worker)
+    d = {
+        "ID": elemen['ID'].astype(str).to_numpy(), "Type": elemen['Type'].astype(str).to_numpy(),
+        "bh": np.char.add(np.char.add(b_mm.astype(str), " x "), h_mm.astype(str)),
+        "Mu": np.asarray(Mu, dtype=float), "As_req": np.asarray(desain['As_req'], dtype=float),
+        "As_min": np.broadcast_to(np.asarray(desain['As_min'], dtype=float), (n,)),
+        "Tulangan": np.char.add(np.asarray(desain['n_bar']).astype(int).astype(str), f" D{dia}"),
+        "phi_Mn": np.asarray(desain['phi_Mn'], dtype=float),
+        "OK": np.broadcast_to(np.asarray(desain['OK'], dtype=bool), (n,)),
+    }
+    if kombinasi is not None:
+        d["Kombinasi"] = np.asarray(kombinasi).astype(str)
+    if My is not None:
+        d.update({
+            "My": np.asarray(My, dtype=float), "As_req_y": np.asarray(desain_y['As_req'], dtype=float),
+            "Tulangan_y": np.char.add(np.asarray(desain_y['n_bar']).astype(int).astype(str), f" D{dia}"),
+            "phi_Mn_y": np.asarray(desain_y['phi_Mn'], dtype=float),
+            "OK_y": np.broadcast_to(np.asarray(desain_y['OK'], dtype=bool), (n,)),
+        })
+        if kombinasi_y is not None:
+            d["Kombinasi_y"] = np.asarray(kombinasi_y).astype(str)
+    # Kolom hanya dicek lentur per sumbu (tanpa interaksi P-M) -> ditandai "OK*"
+    d["Status"] = np.where(d["OK"] & d.get("OK_y", True), np.where(d["Type"] == "Column", "OK*", "OK"), "GAGAL")
+
+    if mode == "lengkap":
+        prerender_rumus([RUMUS_AS, RUMUS_MN]) # Worker cukup membaca cache disk
+        per_potongan, halaman = ELEMEN_PER_POTONGAN, (lambda k: k)
+    else:
+        per_potongan = BARIS_PER_HALAMAN * HALAMAN_PER_POTONGAN
+        halaman = lambda k: -(-k // BARIS_PER_HALAMAN)
+
+    sampul = PDFReport()
+    _halaman_sampul(sampul, d, mode, info_proyek)
+
+    if PdfWriter is None:
+        _tulis_elemen(sampul, mode, d, 0, n)
+        return bytes(sampul.output())
+
+    # Nomor halaman lanjut antar potongan: sampul + halaman semua potongan sebelumnya
+    tugas = []
+    for mulai in range(0, n, per_potongan):
+        akhir = min(mulai + per_potongan, n)
+        iris = {k: v[mulai:akhir] for k, v in d.items()}
+        tugas.append((mode, iris, 0, akhir - mulai, sampul.page_no() + halaman(mulai)))
+
+    n_proses = n_proses or min(len(tugas), os.cpu_count() or 1)
+    if n_proses > 1 and len(tugas) > 1:
+        with ProcessPoolExecutor(n_proses) as ex:
+            potongan = list(ex.map(_render_potongan, tugas))
+    else:
+        potongan = [_render_potongan(t) for t in tugas]
+
+    writer = PdfWriter()
+    for pdf_bytes in [bytes(sampul.output())] + potongan:
+        for page in PdfReader(io.BytesIO(pdf_bytes)).pages:
+            writer.add_page(page)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
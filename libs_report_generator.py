@@ -1,6 +1,6 @@
 from fpdf import FPDF
-import matplotlib.pyplot as plt
 import io
+from libs_pdf import rumus_png
 
 class PDFReport(FPDF):
     def header(self):
@@ -10,17 +10,10 @@ class PDFReport(FPDF):
 
     def render_math_formula(self, latex_str):
         """
-        Ubah string LaTeX jadi Gambar PNG transparan
+        Ubah string LaTeX jadi Gambar PNG transparan (dari cache rumus libs_pdf)
         """
-        fig = plt.figure(figsize=(4, 1)) # Ukuran kanvas kecil
-        fig.text(0.5, 0.5, f"${latex_str}$", fontsize=15, ha='center', va='center')
-        plt.axis('off')
-        
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight', transparent=True)
-        buf.seek(0)
-        plt.close(fig)
-        return buf
+        # Ukuran kanvas kecil, resolusi tinggi
+        return io.BytesIO(rumus_png(latex_str, dpi=300, figsize=(4, 1), fontsize=15))
 
     def add_calculation_step(self, title, formula_latex, result_text):
         self.set_font('Arial', 'B', 10)
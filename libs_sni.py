@@ -4,6 +4,9 @@ class SNI_Concrete_2847:
     """
     Engine perhitungan Struktur Beton Bertulang berdasarkan SNI 2847:2019
     """
+    # Jarak serat tarik ke titik berat tulangan (mm): selimut 40 + sengkang D10 + 1/2 D12
+    DS = 40 + 10 + 6
+
     def __init__(self, fc, fy):
         self.fc = fc # MPa
         self.fy = fy # MPa
@@ -45,9 +48,36 @@ class SNI_Concrete_2847:
         # Cek Minimum Reinforcement (SNI 2847 Pasal 9.6.1.2)
         As_min1 = (0.25 * np.sqrt(self.fc) / self.fy) * b * d
         As_min2 = (1.4 / self.fy) * b * d
-        As_min = max(As_min1, As_min2)
+        As_min = np.maximum(As_min1, As_min2)
+        
+        return np.maximum(As_perlu, As_min)
+
+    def desain_tulangan_batch(self, Mu_kNm, b, h, ds, dia=16, n_min=2):
+        """
+        Desain lentur seluruh elemen sekaligus (array-in / array-out, tanpa loop).
+        Mu_kNm, b, h, ds: array (atau skalar, di-broadcast). b, h, ds dalam mm.
+        dia: diameter tulangan (mm), skalar atau array per elemen.
+        Output: dict array -> As_req, As_min, As_max, n_bar, As_pasang, phi_Mn, OK
+        """
+        Mu = np.abs(np.asarray(Mu_kNm, dtype=float))
+        b = np.asarray(b, dtype=float)
+        h = np.asarray(h, dtype=float)
+        d = h - ds
+        
+        As_req = self.kebutuhan_tulangan(Mu, b, h, ds)
+        As_min = np.maximum(0.25 * np.sqrt(self.fc) / self.fy, 1.4 / self.fy) * b * d
         
-        return max(As_perlu, As_min)
+        # Batas tulangan terkendali tarik (regangan baja >= 0.005, SNI 2847 Tabel 21.2.2)
+        As_max = 0.85 * self.beta1 * self.fc / self.fy * (0.003 / (0.003 + 0.005)) * b * d
+        
+        A_bar = 0.25 * np.pi * np.asarray(dia, dtype=float)**2
+        n_bar = np.maximum(np.ceil(As_req / A_bar), n_min).astype(int)
+        As_pasang = n_bar * A_bar
+        phi_Mn = self.hitung_momen_nominal(b, h, As_pasang, ds)
+        
+        OK = (d > 0) & (phi_Mn >= Mu) & (As_pasang <= As_max)
+        return {"As_req": As_req, "As_min": As_min, "As_max": As_max, "n_bar": n_bar,
+                "As_pasang": As_pasang, "phi_Mn": phi_Mn, "OK": OK}
 
 class SNI_Load_1727:
     """
@@ -63,3 +93,34 @@ class SNI_Load_1727:
         k1 = 1.4 * D
         k2 = 1.2 * D + 1.6 * L
         return max(k1, k2)
+
+    @staticmethod
+    def tabel_kombinasi(kasus=("D", "L", "Ex", "Ey", "Wx", "Wy")):
+        """
+        Tabel Kombinasi Beban Terfaktor SNI 1727:2020 Pasal 2.3.1 (+ SNI 1726:2019 arah ortogonal 100%-30%).
+        Beban atap Lr/R tidak dimodelkan, sehingga kombinasi 3 menjadi 1.2D + 0.5W,
+        kombinasi 4 = 1.2D + 1.0W + 1.0L dan kombinasi 6 = 0.9D + 1.0W.
+        Output: dict {nama_kombinasi: {nama_kasus: faktor}} -> dipakai Frame3D_Engine.kombinasi()
+        Kombinasi yang memakai kasus di luar 'kasus' tidak disertakan.
+        """
+        tabel = {}
+        def tambah(faktor):
+            faktor = {k: v for k, v in faktor.items() if v != 0}
+            if not set(faktor) <= set(kasus): return
+            nama = " + ".join(f"{v:.1f}{k}" for k, v in faktor.items()).replace("+ -", "- ")
+            tabel[nama] = faktor
+
+        tambah({"D": 1.4})
+        tambah({"D": 1.2, "L": 1.6})
+        for s in (1, -1):
+            for w in ("Wx", "Wy"):
+                tambah({"D": 1.2, w: 0.5 * s})
+                tambah({"D": 1.2, "L": 1.0, w: 1.0 * s})
+                tambah({"D": 0.9, w: 1.0 * s})
+        # Gempa: 100% arah utama + 30% arah tegak lurus
+        for sx in (1, -1):
+            for sy in (1, -1):
+                for ex, ey in ((1.0, 0.3), (0.3, 1.0)):
+                    tambah({"D": 1.2, "L": 1.0, "Ex": ex * sx, "Ey": ey * sy})
+                    tambah({"D": 0.9, "Ex": ex * sx, "Ey": ey * sy})
+        return tabel
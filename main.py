@@ -3,10 +3,13 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
 from io import BytesIO
 import json
 import re
 import time
+import os
+import tempfile
 from PIL import Image
 import docx
 import zipfile
@@ -28,6 +31,9 @@ import libs_geoteknik as geo
 import libs_export as exp
 import libs_baja as steel
 import libs_gempa as quake
+import libs_grid as grid
+import libs_frame3d as f3d
+import libs_cache as cache
 
 # --- IMPORT BACKEND DATABASE (Safety) ---
 try:
@@ -66,22 +72,24 @@ st.markdown("""
 # 2. CLASS ENGINEERING (ANASTRUCT ENGINE)
 # ==========================================
 class StructuralEngine:
-    def __init__(self, materials):
+    def __init__(self, materials, cache=None):
         self.materials = materials
+        self.cache = cache # libs_cache.ResultCache (opsional)
         
     def analyze_simple_frame(self, nodes, elements, load_value):
-        ss = SystemElements() 
-        for idx, el in elements.iterrows():
-            n1 = nodes[nodes['ID'] == el['Start']].iloc[0]
-            n2 = nodes[nodes['ID'] == el['End']].iloc[0]
-            EI_val = 5000 * (el['b'] * el['h']**3 / 12) * 10000 
-            EA_val = 15000 * (el['b'] * el['h']) * 1000
-            ss.add_element(location=[[n1['X'], n1['Z']], [n2['X'], n2['Z']]], EI=EI_val, EA=EA_val)
-
-        for idx, n in nodes.iterrows():
-            if n['Z'] == 0:
-                nid = ss.find_node_id(location=[n['X'], n['Z']])
-                if nid: ss.add_support_fixed(node_id=nid)
+        ss = SystemElements()
+        store = nodes if isinstance(nodes, grid.NodeStore) else grid.NodeStore(nodes)
+        p1, p2 = store.resolve_endpoints(elements)
+        b_arr = elements['b'].to_numpy(); h_arr = elements['h'].to_numpy()
+        EI_arr = 5000 * (b_arr * h_arr**3 / 12) * 10000
+        EA_arr = 15000 * (b_arr * h_arr) * 1000
+        for i in range(len(EI_arr)):
+            ss.add_element(location=[[p1[i, 0], p1[i, 2]], [p2[i, 0], p2[i, 2]]], EI=EI_arr[i], EA=EA_arr[i])
+
+        base = store.Z == 0
+        for x, z in zip(store.X[base], store.Z[base]):
+            nid = ss.find_node_id(location=[x, z])
+            if nid: ss.add_support_fixed(node_id=nid)
         
         if load_value > 0:
             ss.q_load(q=-load_value, element_id='all', direction='y')
@@ -89,6 +97,45 @@ class StructuralEngine:
         ss.solve()
         return ss
 
+    def analyze_space_frame(self, nodes, elements, load_value):
+        """
+        Analisa seluruh model 3D sekaligus (libs_frame3d) -> (engine, result).
+        Cache dicek lebih dulu; saat hit engine hanya berisi geometri plot (tanpa K & solve).
+        """
+        key = None
+        if self.cache is not None:
+            store = nodes if isinstance(nodes, grid.NodeStore) else grid.NodeStore(nodes)
+            key = cache.hash_stabil("gravitasi", f3d.VERSI_HASIL, store.ids, store.xyz,
+                                    elements[['Type', 'Start', 'End', 'b', 'h']], self.materials, load_value)
+            res = self.cache.get(key)
+            if res is not None:
+                return f3d.Frame3D_Engine(self.materials).build(store, elements, rakit_kekakuan=False), res
+
+        engine = f3d.Frame3D_Engine(self.materials).build(nodes, elements)
+        res = engine.solve(load_value)
+        if key is not None:
+            self.cache.put(key, res)
+        return engine, res
+
+@st.cache_resource
+def get_ifc_cache():
+    """Cache hasil parse IFC per hash file (memori + .npz kolumnar di disk, dibatasi 2 GB)"""
+    return cache.ResultCache(maks_bytes=128 * 2**20,
+                             folder_disk=os.path.join(tempfile.gettempdir(), "smartbim_cache", "ifc"),
+                             maks_bytes_disk=2 * 2**30, versi=bim.VERSI_PARSER)
+
+@st.cache_resource
+def get_result_cache():
+    """Cache hasil analisa lintas rerun (LRU memori + folder temp di disk)"""
+    return cache.ResultCache(maks_bytes=256 * 2**20,
+                             folder_disk=os.path.join(tempfile.gettempdir(), "smartbim_cache", "analisa"),
+                             versi=f3d.VERSI_HASIL)
+
+@st.cache_resource
+def get_ahsp_engine():
+    """AHSP_Engine + matriks koefisien terkompilasi, dibuat sekali (bukan tiap rerun)"""
+    return ahsp.AHSP_Engine()
+
 # ==========================================
 # 3. INISIALISASI SESSION STATE
 # ==========================================
@@ -251,18 +298,40 @@ elif menu_selection == "📂 Estimator (Arsitek)":
     
     # [RESTORASI FITUR LENGKAP ESTIMATOR]
     uploaded_ifc = st.file_uploader("Upload File IFC", type=["ifc"])
+    paralel_ifc = st.checkbox("Parse paralel (multi-core)", value=False,
+                              help="Tiap proses membuka model IFC sendiri -> memori ~N kali lipat. "
+                                   "Jumlah proses dibatasi memori bebas; jika tidak cukup, parse serial.")
     if uploaded_ifc:
         try:
             with st.spinner("Membaca & Membedah Data IFC..."):
-                eng_ifc = bim.IFC_Parser_Engine(uploaded_ifc)
-                df_s = eng_ifc.parse_structure() # Parse Struktur
-                q_a = eng_ifc.parse_architectural_quantities() # QTO Arsitek
-                q_m = eng_ifc.parse_mep_quantities() # [RESTORED] QTO MEP
+                # Struktur + QTO Arsitek + QTO MEP dalam satu lintasan streaming
+                # (file yang sama diambil dari cache hash konten, tanpa parse ulang)
+                bar_ifc = st.progress(0.0, text="Membaca entitas IFC...")
+                # Default serial; paralel hanya jika diminta (dibatasi memori di parse_paralel)
+                n_proses = (os.cpu_count() or 1) if paralel_ifc else 1
+                df_s, q_a, q_m, dari_cache = bim.parse_dengan_cache(
+                    uploaded_ifc, get_ifc_cache(),
+                    progress=lambda f, pesan: bar_ifc.progress(min(f, 1.0), text=pesan), n_proses=n_proses)
+                bar_ifc.empty()
                 
-                # Simpan ke Session State (Gabung Arsitek + MEP)
+                # Simpan ke Session State (Gabung Arsitek + MEP + Volume Beton dari geometri IFC)
                 st.session_state.arsitek_mep = {**q_a, **q_m}
+                if not df_s.empty and 'Volume' in df_s:
+                    beton = df_s['Type'].isin(["Column", "Beam", "Slab", "Footing", "Pile"])
+                    st.session_state.arsitek_mep["Volume Beton Struktur IFC (m3)"] = round(
+                        float(df_s.loc[beton, 'Volume'].sum()), 2)
+                
+                st.success(f"✅ Berhasil membaca {len(df_s)} elemen struktur & data arsitektur!"
+                           + (" (dari cache)" if dari_cache else ""))
                 
-                st.success(f"✅ Berhasil membaca {len(df_s)} elemen struktur & data arsitektur!")
+                # Model analisa dari Kolom & Balok IFC (titik ujung di-snap dengan KD-tree)
+                ifc_nodes, ifc_elements = bim.ifc_ke_model_analisa(df_s)
+                if not ifc_elements.empty:
+                    st.session_state.ifc_model = (ifc_nodes, ifc_elements)
+                    st.info(f"Model analisa IFC: {len(ifc_nodes)} node, {len(ifc_elements)} elemen "
+                            "-> pilih 'Import IFC' di menu Analisa Struktur.")
+                    for p in f3d.cek_stabilitas(ifc_nodes, ifc_elements):
+                        st.warning(f"Model analisa IFC: {p}")
                 
                 # [RESTORED] VISUALISASI 3D
                 if st.checkbox("Tampilkan Preview Struktur (Scatter Plot)"):
@@ -279,8 +348,14 @@ elif menu_selection == "📂 Estimator (Arsitek)":
                         st.pyplot(fig)
                 
                 # [RESTORED] DOWNLOAD CAD
-                engine_export = exp.Export_Engine()
                 if not df_s.empty:
+                    fmt_dxf = st.radio("Format DXF", ["ASCII Ringkas (0.1 mm)", "Binary", "ASCII Penuh"], horizontal=True)
+                    if fmt_dxf == "Binary":
+                        engine_export = exp.Export_Engine(format_dxf="binary", polyline=True)
+                    elif fmt_dxf == "ASCII Penuh":
+                        engine_export = exp.Export_Engine()
+                    else:
+                        engine_export = exp.Export_Engine(presisi=4, polyline=True)
                     dxf_data = engine_export.generate_bim_dxf(df_s)
                     st.download_button("📐 Download Denah CAD (.dxf)", dxf_data, "Denah_BIM.dxf", "application/dxf")
 
@@ -320,65 +395,57 @@ elif menu_selection == "🏗️ Analisa Struktur (Global)":
 
     with tab_model:
         st.subheader("Visualisasi Wireframe")
-        nodes = []; elements = []; nid = 1; eid = 1
-        for z in st.session_state.levels:
-            for y in st.session_state.grid_y:
-                for x in st.session_state.grid_x:
-                    nodes.append({"ID": nid, "X": x, "Y": y, "Z": z}); nid += 1
-        df_nodes = pd.DataFrame(nodes)
+        sumber = "Grid"
+        if st.session_state.get('ifc_model') is not None:
+            sumber = st.radio("Sumber Model:", ["Grid", "Import IFC"], horizontal=True)
+        if sumber == "Import IFC":
+            df_nodes, df_elements = st.session_state.ifc_model
+        else:
+            df_nodes, df_elements = grid.generate_grid_frame(
+                st.session_state.grid_x, st.session_state.grid_y, st.session_state.levels, st.session_state.sections)
         st.session_state.struct_nodes = df_nodes
-        
-        # Connect Elements
-        for i, node in df_nodes.iterrows():
-            upper = df_nodes[(df_nodes['X']==node['X']) & (df_nodes['Y']==node['Y']) & (df_nodes['Z']>node['Z'])].sort_values('Z')
-            if not upper.empty:
-                target = upper.iloc[0]
-                sec = st.session_state.sections[st.session_state.sections['Type']=='Kolom'].iloc[0]
-                elements.append({"ID": f"C{eid}", "Type": "Column", "Start": node['ID'], "End": target['ID'], "b": sec['b (m)'], "h": sec['h (m)']}); eid += 1
-        
-        for i, node in df_nodes.iterrows():
-            if node['Z'] == 0: continue
-            right = df_nodes[(df_nodes['Y']==node['Y']) & (df_nodes['Z']==node['Z']) & (df_nodes['X']>node['X'])].sort_values('X')
-            if not right.empty:
-                target = right.iloc[0]
-                sec = st.session_state.sections[st.session_state.sections['Type']=='Balok'].iloc[0]
-                elements.append({"ID": f"Bx{eid}", "Type": "Beam", "Start": node['ID'], "End": target['ID'], "b": sec['b (m)'], "h": sec['h (m)']}); eid += 1
-            back = df_nodes[(df_nodes['X']==node['X']) & (df_nodes['Z']==node['Z']) & (df_nodes['Y']>node['Y'])].sort_values('Y')
-            if not back.empty:
-                target = back.iloc[0]
-                sec = st.session_state.sections[st.session_state.sections['Type']=='Balok'].iloc[0]
-                elements.append({"ID": f"By{eid}", "Type": "Beam", "Start": node['ID'], "End": target['ID'], "b": sec['b (m)'], "h": sec['h (m)']}); eid += 1
-        
-        df_elements = pd.DataFrame(elements)
         st.session_state.struct_elements = df_elements
+        st.session_state.struct_sumber = sumber
+        
+        node_store = grid.NodeStore(df_nodes)
+        st.session_state.struct_store = node_store
         
         fig = plt.figure(figsize=(10, 6))
         ax = fig.add_subplot(111, projection='3d')
         if not df_elements.empty:
-            for _, el in df_elements.iterrows():
-                n1 = df_nodes[df_nodes['ID'] == el['Start']].iloc[0]
-                n2 = df_nodes[df_nodes['ID'] == el['End']].iloc[0]
-                c = 'red' if el['Type'] == 'Column' else 'blue'
-                ax.plot([n1['X'], n2['X']], [n1['Y'], n2['Y']], [n1['Z'], n2['Z']], c=c, lw=2)
+            segs = node_store.segments(df_elements)
+            warna = np.where(df_elements['Type'] == 'Column', 'red', 'blue')
+            ax.add_collection3d(Line3DCollection(segs, colors=warna, lw=2))
+            ax.auto_scale_xyz(node_store.X, node_store.Y, node_store.Z)
         ax.set_xlabel('X'); ax.set_ylabel('Y'); ax.set_zlabel('Z')
         st.pyplot(fig)
 
     with tab_run:
         st.subheader("Engine Analisa Struktur")
-        sel_grid_y = st.selectbox("Pilih Grid Y:", st.session_state.grid_y)
-        plane_nodes = df_nodes[df_nodes['Y'] == sel_grid_y]
-        plane_ids = plane_nodes['ID'].tolist()
-        plane_els = df_elements[(df_elements['Start'].isin(plane_ids)) & (df_elements['End'].isin(plane_ids))]
+        opsi_y = st.session_state.grid_y if sumber == "Grid" else np.unique(node_store.Y).tolist()
+        sel_grid_y = st.selectbox("Pilih Grid Y:", opsi_y)
+        p1, p2 = node_store.resolve_endpoints(df_elements)
+        mask_plane = np.isclose(p1[:, 1], sel_grid_y) & np.isclose(p2[:, 1], sel_grid_y)
         load_val = st.number_input("Beban Merata (kN/m)", 15.0)
         
         if st.button("▶️ RUN ANALYSIS"):
-            with st.spinner("Menghitung..."):
-                engine = StructuralEngine({'fc': fc_in, 'fy': fy_in})
-                ss_result = engine.analyze_simple_frame(plane_nodes, plane_els, load_val)
-                c1, c2 = st.columns(2)
-                with c1: st.write("Diagram Momen"); st.pyplot(ss_result.show_bending_moment(show=False))
-                with c2: st.write("Deformasi"); st.pyplot(ss_result.show_displacement(show=False))
-                st.success("Analisa Selesai!")
+            # Model tidak stabil (bagian melayang / node lepas) -> K singular, hentikan sebelum solve
+            pesan_model = f3d.cek_stabilitas(node_store, df_elements)
+            if pesan_model:
+                st.error("Model tidak dapat dianalisa:\n\n" + "\n".join(f"- {p}" for p in pesan_model) +
+                         "\n\nPeriksa sambungan member (toleransi snap IFC) atau tambahkan kolom ke tumpuan.")
+            else:
+                with st.spinner("Menghitung Model 3D..."):
+                    try:
+                        engine = StructuralEngine({'fc': fc_in, 'fy': fy_in}, cache=get_result_cache())
+                        eng3d, res3d = engine.analyze_space_frame(node_store, df_elements, load_val)
+                    except RuntimeError as e:
+                        st.error(f"Analisa gagal (matriks kekakuan singular / tidak stabil): {e}")
+                    else:
+                        c1, c2 = st.columns(2)
+                        with c1: st.write("Diagram Momen"); st.pyplot(f3d.plot_portal(eng3d, res3d, mask_plane, 1, mode="Momen"))
+                        with c2: st.write("Deformasi"); st.pyplot(f3d.plot_portal(eng3d, res3d, mask_plane, 1, mode="Deformasi"))
+                        st.success("Analisa Selesai!")
 
 # --- D. KALKULATOR TEKNIK ---
 elif menu_selection == "🧮 Kalkulator Teknik (Detail)":
@@ -386,7 +453,7 @@ elif menu_selection == "🧮 Kalkulator Teknik (Detail)":
     
     # Init Engines Lokal
     calc_sni_local = sni.SNI_Concrete_2847(fc_in, fy_in)
-    calc_biaya = ahsp.AHSP_Engine()
+    calc_biaya = get_ahsp_engine()
     calc_fdn = fdn.Foundation_Engine(sigma_tanah)
     calc_geo = geo.Geotech_Engine(gamma_tanah, phi_tanah, c_tanah)
     engine_export = exp.Export_Engine()
@@ -464,7 +531,7 @@ elif menu_selection == "🧮 Kalkulator Teknik (Detail)":
 # --- E. RAB FINAL ---
 elif menu_selection == "💰 Integrasi RAB Final":
     st.markdown('<div class="main-header">💰 Rekapitulasi Biaya</div>', unsafe_allow_html=True)
-    calc_biaya = ahsp.AHSP_Engine()
+    calc_biaya = get_ahsp_engine()
     engine_export = exp.Export_Engine()
 
     d_str = st.session_state.get('structure', {})
@@ -473,9 +540,25 @@ elif menu_selection == "💰 Integrasi RAB Final":
     d_bim = st.session_state.get('arsitek_mep', {})
     d_draw = st.session_state.get('drawing', {})
     
-    vol_beton = d_str.get('vol_beton', 0) + d_pon.get('fp_beton', 0)
+    vol_beton = d_str.get('vol_beton', 0) + d_pon.get('fp_beton', 0) + d_bim.get('Volume Beton Struktur IFC (m3)', 0)
+    lembar_excel = {}
     if not st.session_state.struct_elements.empty:
-        for _, el in st.session_state.struct_elements.iterrows(): vol_beton += 4.0 * el['b'] * el['h']
+        df_el = st.session_state.struct_elements
+        # Panjang elemen nyata dari koordinat node (bukan asumsi 4 m)
+        p1, p2 = st.session_state.struct_store.resolve_endpoints(df_el)
+        panjang = np.linalg.norm(p2 - p1, axis=1)
+        vol_el = panjang * df_el['b'].to_numpy() * df_el['h'].to_numpy()
+        # Model dari IFC: kolom & balok sudah terhitung di volume beton struktur IFC
+        if st.session_state.get('struct_sumber') != "Import IFC":
+            vol_beton += float(vol_el.sum())
+        # Rincian per elemen untuk Excel (kolom array langsung, tanpa DataFrame perantara)
+        lembar_excel['Volume Elemen'] = {
+            "ID": df_el['ID'].to_numpy(), "Type": df_el['Type'].to_numpy(),
+            "b (m)": df_el['b'].to_numpy(), "h (m)": df_el['h'].to_numpy(),
+            "Panjang (m)": panjang, "Volume (m3)": vol_el,
+        }
+    if d_bim:
+        lembar_excel['Kuantitas IFC'] = (["Item", "Nilai"], list(d_bim.items()))
 
     vol_dinding = d_draw.get('vol_dinding', 0) if d_draw else d_bim.get('Luas Dinding (m2)', 0)
     vol_pipa = d_bim.get('Panjang Pipa/Duct (m\')', 0)
@@ -489,10 +572,12 @@ elif menu_selection == "💰 Integrasi RAB Final":
     }
     h_wage = {'pekerja': u_pekerja, 'tukang': u_tukang, 'mandor': u_pekerja*1.2}
     
-    hsp_b = calc_biaya.hitung_hsp('beton_k250', h_mat, h_wage)
-    hsp_d = calc_biaya.hitung_hsp('pasangan_bata_merah', h_mat, h_wage)
-    hsp_p = calc_biaya.hitung_hsp('pasang_pipa_pvc', h_mat, h_wage)
-    hsp_t = calc_biaya.hitung_hsp('pasangan_batu_kali', h_mat, h_wage)
+    # HSP seluruh analisa dalam satu perkalian matriks-vektor
+    hsp_all = calc_biaya.hitung_semua(h_mat, h_wage)
+    hsp_b = hsp_all['beton_k250']
+    hsp_d = hsp_all['pasangan_bata_merah']
+    hsp_p = hsp_all['pasang_pipa_pvc']
+    hsp_t = hsp_all['pasangan_batu_kali']
     
     rab_data = [
         {"Item": "Beton Struktur", "Vol": vol_beton, "Sat": "m3", "Hrg": hsp_b, "Tot": vol_beton*hsp_b},
@@ -506,7 +591,14 @@ elif menu_selection == "💰 Integrasi RAB Final":
     st.success(f"### TOTAL RAB: Rp {df_rab['Tot'].sum():,.0f}")
     
     s_data = {'fc': fc_in, 'fy': fy_in, 'b': 0, 'h': 0, 'sigma': sigma_tanah}
-    st.download_button("📊 Download Excel", engine_export.create_excel_report(df_rab, s_data), "RAB.xlsx")
+    # Excel (termasuk lembar per elemen) disusun hanya saat diminta, bytes disimpan per isi RAB
+    kunci_rab = cache.hash_stabil(df_rab, s_data, st.session_state.struct_elements,
+                                  st.session_state.get('struct_store'), list(d_bim.items()))
+    if st.button("📊 Buat Excel RAB"):
+        with st.spinner("Menyusun Excel..."):
+            st.session_state['xlsx_rab'] = (kunci_rab, engine_export.create_excel_report(df_rab, s_data, lembar_excel))
+    if st.session_state.get('xlsx_rab', (None,))[0] == kunci_rab:
+        st.download_button("📥 Download Excel", st.session_state['xlsx_rab'][1], "RAB.xlsx")
 
 # --- F. AI CHAT ---
 elif menu_selection == "🤖 Konsultan AI":